@@ -5,8 +5,11 @@ import requests
 BACKEND = os.getenv("BACKEND_URL", "http://127.0.0.1:8000")
 TEXT = "علی در تهران زندگی می‌کند و در شرکت دیجی‌کالا کار می‌کند."
 
+# One keep-alive connection for both requests
+session = requests.Session()
+
 print("Posting to /api/extract ...")
-r = requests.post(f"{BACKEND}/api/extract", json={
+r = session.post(f"{BACKEND}/api/extract", json={
 	"text": TEXT,
 	"language": "fa",
 	"schema": "general",
@@ -15,7 +18,7 @@ r.raise_for_status()
 print("JSON:", r.json())
 
 print("Posting to /api/report ...")
-report = requests.post(f"{BACKEND}/api/report", json={
+report = session.post(f"{BACKEND}/api/report", json={
 	"text": TEXT,
 	"language": "fa",
 	"schema": "general",
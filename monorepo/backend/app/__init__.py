@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Add shared package to sys.path so app modules can import langextract
+CURRENT_DIR = os.path.dirname(__file__)
+MONOREPO_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, "..", ".."))
+SHARED_DIR = os.path.join(MONOREPO_ROOT, "shared")
+if SHARED_DIR not in sys.path:
+	sys.path.insert(0, SHARED_DIR)
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import orjson
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCache:
+	"""LRU cache of deterministic LLM results, optionally mirrored to JSON files on disk.
+
+	Values must be JSON-serialisable (the dicts returned by langextract).
+	"""
+
+	def __init__(self, max_entries: int = 256, cache_dir: Optional[str] = None) -> None:
+		self.max_entries = max_entries
+		self.cache_dir = cache_dir or None
+		self.hits = 0
+		self.misses = 0
+		self._entries: "OrderedDict[str, Any]" = OrderedDict()
+		if self.cache_dir:
+			os.makedirs(self.cache_dir, exist_ok=True)
+
+	@staticmethod
+	def make_key(**parts: Any) -> str:
+		"""sha256 over the named parts; each name and value is length-prefixed so fields can't run together."""
+		h = hashlib.sha256()
+		for name in sorted(parts):
+			try:
+				value = orjson.dumps(parts[name], option=orjson.OPT_SORT_KEYS)
+			except orjson.JSONEncodeError:
+				# e.g. integers beyond 64 bits in request attributes; the stdlib encoder takes anything JSON can hold
+				value = json.dumps(parts[name], sort_keys=True, default=str).encode("utf-8")
+			for chunk in (name.encode("utf-8"), value):
+				h.update(len(chunk).to_bytes(8, "big"))
+				h.update(chunk)
+		return h.hexdigest()
+
+	def _path(self, key: str) -> str:
+		return os.path.join(self.cache_dir, f"{key}.json")  # type: ignore[arg-type]
+
+	def _read(self, key: str) -> Optional[Any]:
+		try:
+			with open(self._path(key), "rb") as f:
+				return orjson.loads(f.read())
+		except (OSError, orjson.JSONDecodeError):
+			return None
+
+	def _write(self, key: str, value: Any) -> None:
+		"""Mirror one entry to disk; failures are logged, since the on-disk copy is only a cache."""
+		tmp = None
+		try:
+			data = orjson.dumps(value)
+			# A unique temp file per writer, so concurrent writes of one key can't replace each other's file
+			fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+			with os.fdopen(fd, "wb") as f:
+				f.write(data)
+			os.replace(tmp, self._path(key))
+		except (OSError, orjson.JSONEncodeError) as e:
+			logger.warning("LLM cache write failed for %s: %s", key, e)
+			if tmp is not None:
+				try:
+					os.remove(tmp)
+				except OSError:
+					pass
+
+	def _remember(self, key: str, value: Any) -> None:
+		self._entries[key] = value
+		self._entries.move_to_end(key)
+		while len(self._entries) > self.max_entries:
+			self._entries.popitem(last=False)
+
+	async def get(self, key: str) -> Optional[Any]:
+		value = self._entries.get(key)
+		if value is not None:
+			self._entries.move_to_end(key)
+		elif self.cache_dir:
+			value = await run_in_threadpool(self._read, key)
+			if value is not None:
+				self._remember(key, value)
+		if value is None:
+			self.misses += 1
+		else:
+			self.hits += 1
+		return value
+
+	async def set(self, key: str, value: Any) -> None:
+		self._remember(key, value)
+		if self.cache_dir:
+			await run_in_threadpool(self._write, key, value)
+
+	def clear(self) -> int:
+		"""Drop every entry (memory and disk); returns the number of in-memory entries removed."""
+		count = len(self._entries)
+		self._entries.clear()
+		if self.cache_dir:
+			for name in os.listdir(self.cache_dir):
+				if name.endswith(".json"):
+					try:
+						os.remove(os.path.join(self.cache_dir, name))
+					except OSError:
+						pass
+		return count
+
+	def stats(self) -> Dict[str, int]:
+		return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -6,12 +6,44 @@ OLLAMA_MODEL: str = os.getenv("OLLAMA_MODEL", "gemma3:4b")
 REQUEST_TIMEOUT_SECONDS: int = int(os.getenv("REQUEST_TIMEOUT_SECONDS", "120"))
 TEMPERATURE: float = float(os.getenv("TEMPERATURE", "0"))
 MAX_OUTPUT_TOKENS: int = int(os.getenv("MAX_OUTPUT_TOKENS", "1024"))
+# Max concurrent LLM requests sent to Ollama from this process
+MAX_CONCURRENT_LLM: int = int(os.getenv("MAX_CONCURRENT_LLM", "4"))
+MODELS_CACHE_TTL_SECONDS: float = float(os.getenv("MODELS_CACHE_TTL_SECONDS", "30"))
 
 # Input chunking & context window
 NUM_CTX: int = int(os.getenv("NUM_CTX", os.getenv("CONTEXT_WINDOW", "4096")))
 MAX_INPUT_CHARS: int = int(os.getenv("MAX_INPUT_CHARS", "12000"))
 CHUNK_OVERLAP_CHARS: int = int(os.getenv("CHUNK_OVERLAP_CHARS", "200"))
 MAX_CHUNKS: int = int(os.getenv("MAX_CHUNKS", "8"))
+# Chunks of one input sent to Ollama at once; each takes its own MAX_CONCURRENT_LLM slot
+CHUNK_CONCURRENCY: int = max(1, min(int(os.getenv("CHUNK_CONCURRENCY", "4")), MAX_CONCURRENT_LLM))
+# Text beyond MAX_CHUNKS full chunks is never sent to the model, so file extraction can stop there
+MAX_FILE_CHARS: int = MAX_INPUT_CHARS * MAX_CHUNKS
+# Uploads to /api/extract_file larger than this are rejected with 413
+MAX_UPLOAD_BYTES: int = int(os.getenv("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+# Worker processes for parsing uploaded files (PDF/DOCX/...); 0 parses in the threadpool instead
+FILE_EXTRACT_WORKERS: int = int(os.getenv("FILE_EXTRACT_WORKERS", "0"))
+# Chat messages must be longer than this to trigger entity extraction
+MIN_ANALYSIS_CHARS: int = int(os.getenv("MIN_ANALYSIS_CHARS", "50"))
+# Chat history sent to the model: whole up to CHAT_HISTORY_RESET_AT messages, then trimmed in
+# steps back towards the newest CHAT_HISTORY_MIN_WINDOW (see langextract.ollama_backend.trim_history)
+CHAT_HISTORY_MIN_WINDOW: int = int(os.getenv("CHAT_HISTORY_MIN_WINDOW", "20"))
+CHAT_HISTORY_RESET_AT: int = int(os.getenv("CHAT_HISTORY_RESET_AT", "40"))
+
+# LLM result cache (only deterministic calls, i.e. temperature 0, are cached)
+CACHE_ENABLED: bool = os.getenv("CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "256"))
+CACHE_DIR: str = os.getenv("CACHE_DIR", "")
+
+# Speech-to-text microservice (monorepo/speechToText)
+SPEECH_SERVICE_URL: str = os.getenv("SPEECH_SERVICE_URL", "http://localhost:8001")
+# Max transcriptions in flight to the speech service; further uploads wait their turn
+STT_MAX_CONCURRENCY: int = int(os.getenv("STT_MAX_CONCURRENCY", "4"))
+STT_TIMEOUT_SECONDS: float = float(os.getenv("STT_TIMEOUT_SECONDS", "120"))
+
+# Response compression (responses smaller than GZIP_MIN_SIZE bytes are sent as-is)
+GZIP_MIN_SIZE: int = int(os.getenv("GZIP_MIN_SIZE", "1024"))
+GZIP_LEVEL: int = int(os.getenv("GZIP_LEVEL", "5"))
 
 # CORS
 ALLOW_ORIGINS = os.getenv("ALLOW_ORIGINS", "*").split(",")
@@ -0,0 +1,212 @@
+import asyncio
+import re
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+import anyio
+import orjson
+
+from pydantic import TypeAdapter
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+from langextract import run_extraction, iter_extraction, analyze_with_model, referee_analysis  # type: ignore
+from langextract.prompts import PROMPT_VERSION  # type: ignore
+
+from . import config
+from .cache import LLMCache
+from .models import FewShotExample
+
+
+# Bounds in-flight Ollama work; keep in line with the server's OLLAMA_NUM_PARALLEL
+_LLM_SEMAPHORE = asyncio.Semaphore(config.MAX_CONCURRENT_LLM)
+# Callers take their slots one at a time under this lock, so two multi-slot calls can't each
+# hold part of what they need and wait on each other forever
+_LLM_ACQUIRE_LOCK = asyncio.Lock()
+# Calls currently running against Ollama and calls queued behind the semaphore
+_llm_counts = {"in_flight": 0, "waiting": 0}
+
+
+@asynccontextmanager
+async def _llm_slot(slots: int = 1) -> AsyncIterator[None]:
+	"""Hold `slots` of the MAX_CONCURRENT_LLM slots, keeping the health counters up to date."""
+	slots = max(1, min(slots, config.MAX_CONCURRENT_LLM))
+	acquired = 0
+	_llm_counts["waiting"] += 1
+	try:
+		async with _LLM_ACQUIRE_LOCK:
+			while acquired < slots:
+				await _LLM_SEMAPHORE.acquire()
+				acquired += 1
+	except BaseException:
+		for _ in range(acquired):
+			_LLM_SEMAPHORE.release()
+		raise
+	finally:
+		_llm_counts["waiting"] -= 1
+	_llm_counts["in_flight"] += 1
+	try:
+		yield
+	finally:
+		_llm_counts["in_flight"] -= 1
+		for _ in range(slots):
+			_LLM_SEMAPHORE.release()
+
+
+def _extraction_slots(kwargs: Dict[str, Any]) -> int:
+	"""Slots an extraction needs: one per chunk the call may send to Ollama at the same time."""
+	if "chunk_concurrency" not in kwargs or len(kwargs.get("text", "")) <= kwargs["max_input_chars"]:
+		return 1
+	return min(kwargs["chunk_concurrency"], kwargs["max_chunks"])
+
+
+async def run_llm(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+	"""Run a blocking langextract call in the threadpool, limited to MAX_CONCURRENT_LLM requests at once."""
+	async with _llm_slot(_extraction_slots(kwargs)):
+		return await run_in_threadpool(func, *args, **kwargs)
+
+
+def llm_stats() -> Dict[str, int]:
+	return {"max_concurrent": config.MAX_CONCURRENT_LLM, **_llm_counts}
+
+
+extraction_cache = LLMCache(max_entries=config.CACHE_MAX_ENTRIES, cache_dir=config.CACHE_DIR)
+
+
+async def run_llm_cached(func: Callable[..., Any], **kwargs: Any) -> Any:
+	"""run_llm with results cached by their inputs; sampled (temperature > 0) calls always run."""
+	if not config.CACHE_ENABLED or kwargs.get("temperature", 0) > 0:
+		return await run_llm(func, **kwargs)
+	# Timeouts and chunk concurrency don't change the result, so keep them out of the key
+	key_parts = {k: v for k, v in kwargs.items() if k not in ("request_timeout_seconds", "chunk_concurrency")}
+	key = LLMCache.make_key(func=func.__name__, prompt_version=PROMPT_VERSION, **key_parts)
+	cached = await extraction_cache.get(key)
+	if cached is not None:
+		return cached
+	result = await run_llm(func, **kwargs)
+	await extraction_cache.set(key, result)
+	return result
+
+
+# Phrases asking who built the assistant; answered directly instead of extracted
+_AI_QUESTION_KEYWORDS = [
+	'تو کی هستی', 'تو کجا توسعه پیدا کردی', 'چه کسی نوشته ات', 'چه کسی توسعه داده ات', 'علی سلیمی کیه؟',
+	'کجا آموزش دیده ای', 'توسعه دهنده تو کیست', 'نویسنده تو کیست', 'چه کسی تو را ساخته','نویسنده تو چه کسی است' ,
+	'who are you', 'who created you', 'who developed you', 'who wrote you',
+	'where were you developed', 'where were you trained'
+]
+_AI_QUESTION_RE = re.compile("|".join(map(re.escape, _AI_QUESTION_KEYWORDS)), re.IGNORECASE)
+# The phrases are short questions; longer inputs (documents, uploaded files) are never scanned
+_AI_QUESTION_MAX_CHARS = 512
+
+AI_RESPONSE = """من دستیار هوش مصنوعی هستم که در مرکز مدیریت و تحلیل داده فراجا و اداره مهندسی داده توسعه داده شده و آموزش دیده‌ام. توسعه‌دهنده من، سرهنگ مهندس علی سلیمی است و آماده‌ام تا شما را راهنمایی کنم."""
+# Entity-shaped so it validates as models.Entity in every response that carries it
+AI_RESPONSE_ENTITIES = [{
+	"id": None,
+	"name": AI_RESPONSE,
+	"type": "AI_Response",
+	"start_index": 0,
+	"end_index": len(AI_RESPONSE),
+	"attributes": {"confidence": 1.0},
+}]
+
+
+def is_ai_question(text: str) -> bool:
+	return len(text) < _AI_QUESTION_MAX_CHARS and _AI_QUESTION_RE.search(text) is not None
+
+
+_EXAMPLES_ADAPTER = TypeAdapter(List[FewShotExample])
+
+
+def _dump_examples(examples: Optional[List[FewShotExample]]) -> List[Dict[str, Any]]:
+	"""Dump few-shot examples to plain dicts in a single pydantic-core pass."""
+	return _EXAMPLES_ADAPTER.dump_python(examples) if examples else []
+
+
+def extraction_kwargs(
+	text: str,
+	*,
+	language: Optional[str] = None,
+	schema: Optional[str] = None,
+	domain: str = "general",
+	examples: Optional[List[FewShotExample]] = None,
+	model: Optional[str] = None,
+	temperature: Optional[float] = None,
+	max_output_tokens: Optional[int] = None,
+) -> Dict[str, Any]:
+	"""Resolve request options against config into run_extraction keyword arguments."""
+	return {
+		"text": text,
+		"language": (language or "fa").lower(),
+		"schema": schema or "general",
+		"domain": domain,
+		"examples": _dump_examples(examples),
+		"model": model or config.OLLAMA_MODEL,
+		"temperature": temperature if temperature is not None else config.TEMPERATURE,
+		"max_output_tokens": max_output_tokens if max_output_tokens is not None else config.MAX_OUTPUT_TOKENS,
+		"request_timeout_seconds": config.REQUEST_TIMEOUT_SECONDS,
+		"num_ctx": config.NUM_CTX,
+		"max_input_chars": config.MAX_INPUT_CHARS,
+		"chunk_overlap_chars": config.CHUNK_OVERLAP_CHARS,
+		"max_chunks": config.MAX_CHUNKS,
+		"chunk_concurrency": config.CHUNK_CONCURRENCY,
+	}
+
+
+async def do_extraction(kwargs: Dict[str, Any], *, ai_shortcut: bool = True) -> Dict[str, Any]:
+	"""Run (or fetch from cache) run_extraction for kwargs built by extraction_kwargs.
+
+	With ai_shortcut, questions about the assistant itself get the canned answer
+	instead of an LLM call.
+	"""
+	if ai_shortcut and is_ai_question(kwargs["text"]):
+		return {"entities": AI_RESPONSE_ENTITIES, "relationships": []}
+	return await run_llm_cached(run_extraction, **kwargs)
+
+
+async def stream_extraction(kwargs: Dict[str, Any]) -> AsyncIterator[bytes]:
+	"""NDJSON lines of entities/relationships, one per chunk as it finishes (see langextract.iter_extraction).
+
+	Streamed results are not cached.
+	"""
+	if is_ai_question(kwargs["text"]):
+		yield orjson.dumps({"entities": AI_RESPONSE_ENTITIES, "relationships": []}) + b"\n"
+		return
+	async with _llm_slot(_extraction_slots(kwargs)):
+		deltas = iter_extraction(**kwargs)
+		try:
+			async for delta in iterate_in_threadpool(deltas):
+				yield orjson.dumps(delta) + b"\n"
+		finally:
+			# On disconnect, wait off the event loop for chunk calls already sent, holding their slots
+			# meanwhile; shielded, since the cancelled response task would otherwise skip the wait
+			with anyio.CancelScope(shield=True):
+				await run_in_threadpool(deltas.close)
+
+
+async def do_multi_model_analysis(
+	*,
+	text: str,
+	model_first: str,
+	model_second: str,
+	model_referee: str,
+	**options: Any,
+) -> Dict[str, Any]:
+	"""Multi-model analysis with each LLM call admitted (and cached) separately.
+
+	The two independent analyses run concurrently; the referee runs once both are done.
+	options are the remaining run_multi_model_analysis keyword arguments.
+	"""
+	first_analysis, second_analysis = await asyncio.gather(
+		run_llm_cached(analyze_with_model, text=text, model=model_first, **options),
+		run_llm_cached(analyze_with_model, text=text, model=model_second, **options),
+	)
+	return await run_llm_cached(
+		referee_analysis,
+		text=text,
+		first_analysis=first_analysis,
+		second_analysis=second_analysis,
+		model_first=model_first,
+		model_second=model_second,
+		model_referee=model_referee,
+		**options,
+	)
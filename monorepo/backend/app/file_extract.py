@@ -1,16 +1,23 @@
 from __future__ import annotations
 
+import codecs
 import csv
 import io
 import os
-from typing import Optional
+import tempfile
+from typing import BinaryIO, Optional, Union
 
-import chardet
-from bs4 import BeautifulSoup
 from docx import Document
 from lxml import etree
+from lxml import html as lxml_html
 from pypdf import PdfReader
 
+# Prefer the C implementation of encoding detection when available
+try:
+	from cchardet import detect as _detect_charset  # type: ignore
+except Exception:  # pragma: no cover
+	from charset_normalizer import detect as _detect_charset
+
 # Optional heavy import for .doc via textract
 try:
 	import textract  # type: ignore
@@ -22,14 +29,55 @@ else:
 
 SUPPORTED_EXTENSIONS = {".txt", ".csv", ".pdf", ".doc", ".docx", ".xml", ".html", ".htm"}
 
+# Uploaded content: raw bytes or a seekable binary file (e.g. UploadFile.file)
+Source = Union[bytes, BinaryIO]
+
+# Non-UTF-8 files are detected from their head and tail rather than the whole buffer
+_DETECT_SAMPLE_BYTES = 64 * 1024
+
+
+def _as_stream(data: Source) -> BinaryIO:
+	if isinstance(data, (bytes, bytearray)):
+		return io.BytesIO(data)
+	data.seek(0)
+	return data
+
+
+def _as_bytes(data: Source) -> bytes:
+	if isinstance(data, (bytes, bytearray)):
+		return data
+	data.seek(0)
+	return data.read()
+
+
+def _detect_encoding(data: bytes) -> str:
+	if not data:
+		return "utf-8"
+	if data.startswith(codecs.BOM_UTF8):
+		return "utf-8-sig"
+	# Most uploads are UTF-8; a strict decode is exact and avoids sampling an all-ASCII prefix
+	try:
+		data.decode("utf-8")
+		return "utf-8"
+	except UnicodeDecodeError:
+		pass
+	if len(data) > 2 * _DETECT_SAMPLE_BYTES:
+		sample = data[:_DETECT_SAMPLE_BYTES] + data[-_DETECT_SAMPLE_BYTES:]
+	else:
+		sample = data
+	enc = _detect_charset(sample).get("encoding") or "utf-8"
+	# ASCII is a subset of UTF-8; an ASCII guess only means the sample had no high bytes
+	return "utf-8" if enc.lower() == "ascii" else enc
+
 
 def _detect_text(data: bytes) -> str:
 	if not data:
 		return ""
-	enc = chardet.detect(data).get("encoding") or "utf-8"
+	enc = _detect_encoding(data)
 	try:
 		return data.decode(enc, errors="replace")
-	except Exception:
+	except LookupError:
+		# detector returned a codec name Python doesn't know
 		return data.decode("utf-8", errors="replace")
 
 
@@ -38,79 +86,134 @@ def text_from_txt(data: bytes) -> str:
 
 
 def text_from_csv(data: bytes) -> str:
-	text = _detect_text(data)
-	reader = csv.reader(io.StringIO(text))
-	lines = [", ".join(row) for row in reader]
-	return "\n".join(lines)
+	reader = csv.reader(io.StringIO(_detect_text(data)))
+	return "\n".join(", ".join(row) for row in reader)
 
 
-def text_from_pdf(data: bytes) -> str:
-	bio = io.BytesIO(data)
-	reader = PdfReader(bio)
-	out = []
-	for page in reader.pages:
+def text_from_pdf(data: Source, max_chars: Optional[int] = None) -> str:
+	"""Extract page text, stopping once max_chars characters have been collected."""
+	reader = PdfReader(_as_stream(data))
+	out = io.StringIO()
+	for i, page in enumerate(reader.pages):
 		try:
-			out.append(page.extract_text() or "")
+			page_text = page.extract_text() or ""
 		except Exception:
 			continue
-	return "\n".join(out)
+		if i:
+			out.write("\n")
+		out.write(page_text)
+		if max_chars is not None and out.tell() >= max_chars:
+			break
+	return out.getvalue()
 
 
-def text_from_docx(data: bytes) -> str:
-	bio = io.BytesIO(data)
-	doc = Document(bio)
+def text_from_docx(data: Source) -> str:
+	doc = Document(_as_stream(data))
 	return "\n".join(p.text for p in doc.paragraphs)
 
 
 def text_from_doc(data: bytes) -> str:
 	if not extract_doc_available:
 		return ""
-	bio = io.BytesIO(data)
-	# textract requires a filename; write to temp
-	import tempfile
-	with tempfile.NamedTemporaryFile(delete=True, suffix=".doc") as tmp:
-		tmp.write(bio.read())
-		tmp.flush()
-		try:
-			content = textract.process(tmp.name)
-			return content.decode("utf-8", errors="replace")
-		except Exception:
-			return ""
-
-
-def text_from_xml(data: bytes) -> str:
+	# textract requires a filename; write to temp. delete=False so it can be
+	# reopened by name on Windows, removed explicitly below.
+	with tempfile.NamedTemporaryFile(delete=False, suffix=".doc") as tmp:
+		tmp.write(data)
 	try:
-		root = etree.fromstring(data)
-		return " ".join(root.itertext())
+		content = textract.process(tmp.name)
+		return content.decode("utf-8", errors="replace")
 	except Exception:
-		return _detect_text(data)
+		return ""
+	finally:
+		os.unlink(tmp.name)
+
+
+def _iter_xml_text(data: Source):
+	"""Yield the same text pieces as root.itertext() without keeping the whole tree.
+
+	A parent's text and a sibling's tail are complete once the next element
+	starts, so they are emitted then and finished siblings are deleted.
+	"""
+	for event, elem in etree.iterparse(_as_stream(data), events=("start", "end")):
+		parent = elem.getparent()
+		if event == "start":
+			if parent is None:
+				continue
+			if parent.text:
+				yield parent.text
+				parent.text = None
+			prev = elem.getprevious()
+			done = []
+			while prev is not None:
+				done.append(prev)
+				prev = prev.getprevious()
+			for sib in reversed(done):
+				if sib.tail:
+					yield sib.tail
+				parent.remove(sib)
+		else:
+			if elem.text:
+				yield elem.text
+			for child in elem:
+				if child.tail:
+					yield child.tail
+			elem.clear(keep_tail=True)
+
+
+def text_from_xml(data: Source, max_chars: Optional[int] = None) -> str:
+	try:
+		out = []
+		total = 0
+		for piece in _iter_xml_text(data):
+			out.append(piece)
+			total += len(piece) + 1
+			if max_chars is not None and total >= max_chars:
+				break
+		return " ".join(out)
+	except etree.XMLSyntaxError:
+		return _detect_text(_as_bytes(data))
 
 
 def text_from_html(data: bytes) -> str:
 	try:
-		soup = BeautifulSoup(data, "lxml")
-		for s in soup(["script", "style"]):
-			s.extract()
-		return " ".join(soup.stripped_strings)
-	except Exception:
+		# libxml2 assumes latin-1 when the page has no <meta charset>, so pass the detected encoding
+		parser = lxml_html.HTMLParser(encoding=_detect_encoding(data))
+		doc = lxml_html.document_fromstring(data, parser=parser)
+	except (etree.ParserError, LookupError):
+		# empty document, or an encoding name libxml2 doesn't know
 		return _detect_text(data)
-
-
-def extract_text_from_file(filename: str, data: bytes) -> str:
+	for el in doc.xpath("//script|//style"):
+		el.drop_tree()
+	return " ".join(t for t in (s.strip() for s in doc.itertext()) if t)
+
+
+_DISPATCH = {
+	".txt": text_from_txt,
+	".csv": text_from_csv,
+	".pdf": text_from_pdf,
+	".docx": text_from_docx,
+	".doc": text_from_doc,
+	".xml": text_from_xml,
+	".html": text_from_html,
+	".htm": text_from_html,
+}
+# Extractors that can stop early once max_chars is reached
+_BOUNDED = {text_from_pdf, text_from_xml}
+# Extractors that parse straight from a file object, without reading it into memory
+_STREAMING = {text_from_pdf, text_from_docx, text_from_xml}
+
+
+def extract_text_from_file(filename: str, data: Source, max_chars: Optional[int] = None) -> str:
+	"""Extract plain text from an uploaded file; max_chars bounds work for paged formats.
+
+	data may be bytes or a seekable binary file; PDF, DOCX and XML are parsed
+	from the file directly.
+	"""
 	ext = os.path.splitext(filename)[1].lower()
-	if ext == ".txt":
-		return text_from_txt(data)
-	if ext == ".csv":
-		return text_from_csv(data)
-	if ext == ".pdf":
-		return text_from_pdf(data)
-	if ext == ".docx":
-		return text_from_docx(data)
-	if ext == ".doc":
-		return text_from_doc(data)
-	if ext == ".xml":
-		return text_from_xml(data)
-	if ext in {".html", ".htm"}:
-		return text_from_html(data)
-	# default attempt
-	return _detect_text(data)
+	# unknown extensions: default attempt
+	handler = _DISPATCH.get(ext, _detect_text)
+	if handler not in _STREAMING:
+		data = _as_bytes(data)
+	if handler in _BOUNDED:
+		return handler(data, max_chars=max_chars)
+	return handler(data)
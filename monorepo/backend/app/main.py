@@ -1,28 +1,84 @@
-import os
-import sys
+import asyncio
+import logging
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from functools import lru_cache, partial
 import httpx
-from typing import Any, Dict, Optional
+import orjson
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, Request, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response, StreamingResponse
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 
 from . import config
 from .models import ExtractionRequest, ExtractionResponse, SchemasResponse, MultiModelRequest, MultiModelResponse, DomainsResponse, ModelAnalysis, ChatRequest, ChatResponse, SpeechToTextRequest, SpeechToTextResponse, ChartData, ChartDataset
 from .file_extract import extract_text_from_file
+from .extract_service import (
+	AI_RESPONSE,
+	AI_RESPONSE_ENTITIES,
+	do_extraction,
+	do_multi_model_analysis,
+	extraction_cache,
+	extraction_kwargs,
+	is_ai_question,
+	llm_stats,
+	run_llm,
+	stream_extraction,
+)
+
+# Shared langextract package (app/__init__.py puts it on sys.path)
+from langextract import iter_html_report, list_schemas  # type: ignore
+from langextract.ollama_backend import chat_conversational, close_clients, trim_history  # type: ignore
 
-# Add shared package to sys.path
-CURRENT_DIR = os.path.dirname(__file__)
-MONOREPO_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, "..", ".."))
-SHARED_DIR = os.path.join(MONOREPO_ROOT, "shared")
-if SHARED_DIR not in sys.path:
-	sys.path.insert(0, SHARED_DIR)
+logger = logging.getLogger(__name__)
 
-# Import shared langextract after adjusting path
-from langextract import run_extraction, run_multi_model_analysis, generate_html_report, list_schemas  # type: ignore
-from langextract.ollama_backend import chat_conversational  # type: ignore
 
-app = FastAPI(title="LangExtract Service", version="0.2.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+	# Shared pool for the speech-to-text service so uploads reuse keep-alive connections
+	# (pool=None: requests past the connection limit wait for a free connection instead of failing)
+	app.state.http = httpx.AsyncClient(
+		timeout=httpx.Timeout(connect=5.0, read=config.STT_TIMEOUT_SECONDS, write=60.0, pool=None),
+		limits=httpx.Limits(max_keepalive_connections=16, max_connections=32),
+	)
+	# Ollama's /api/tags for the model list; created here so a restarted app gets a fresh client
+	app.state.ollama_http = httpx.AsyncClient(base_url=config.OLLAMA_HOST, timeout=5)
+	# Optional process pool so large PDF/DOCX parses use other cores instead of holding the GIL
+	app.state.file_pool = ProcessPoolExecutor(max_workers=config.FILE_EXTRACT_WORKERS) if config.FILE_EXTRACT_WORKERS > 0 else None
+	try:
+		yield
+	finally:
+		if app.state.file_pool is not None:
+			app.state.file_pool.shutdown(cancel_futures=True)
+		await app.state.http.aclose()
+		await app.state.ollama_http.aclose()
+		close_clients()
+
+
+app = FastAPI(title="LangExtract Service", version="0.2.0", default_response_class=ORJSONResponse, lifespan=lifespan)
+
+_UPLOAD_PATHS = {"/api/extract_file"}
+_UPLOAD_TOO_LARGE = f"File too large (max {config.MAX_UPLOAD_BYTES} bytes)"
+
+
+# Registered before CORS so the 413 still carries CORS headers
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+	"""Reject oversized uploads from Content-Length, before the multipart body is read and spooled."""
+	if request.url.path in _UPLOAD_PATHS:
+		try:
+			length = int(request.headers.get("content-length", "0"))
+		except ValueError:
+			length = 0
+		if length > config.MAX_UPLOAD_BYTES:
+			return ORJSONResponse({"detail": _UPLOAD_TOO_LARGE}, status_code=413)
+	return await call_next(request)
 
 app.add_middleware(
 	CORSMiddleware,
@@ -31,6 +87,8 @@ app.add_middleware(
 	allow_methods=config.ALLOW_METHODS,
 	allow_headers=config.ALLOW_HEADERS,
 )
+# Reports and large extraction results compress well; small responses are left alone
+app.add_middleware(GZipMiddleware, minimum_size=config.GZIP_MIN_SIZE, compresslevel=config.GZIP_LEVEL)
 
 
 @app.get("/api/health")
@@ -39,261 +97,199 @@ def health() -> Dict[str, Any]:
 		"status": "ok",
 		"ollama_host": config.OLLAMA_HOST,
 		"model": config.OLLAMA_MODEL,
+		"cache": extraction_cache.stats(),
+		"llm": llm_stats(),
 	}
 
 
+@app.post("/api/cache/invalidate")
+def invalidate_cache() -> Dict[str, Any]:
+	return {"status": "ok", "cleared": extraction_cache.clear()}
+
+
+# Schemas and domains are static for the lifetime of the process
+_SCHEMAS_RESPONSE = SchemasResponse(schemas=list_schemas())
+_DOMAINS_RESPONSE = DomainsResponse(domains=["general", "legal", "medical", "police"])
+
+
 @app.get("/api/schemas", response_model=SchemasResponse)
 def schemas() -> SchemasResponse:
-	return SchemasResponse(schemas=list_schemas())
+	return _SCHEMAS_RESPONSE
 
 
 @app.get("/api/domains", response_model=DomainsResponse)
 def domains() -> DomainsResponse:
-	return DomainsResponse(domains=["general", "legal", "medical", "police"])
+	return _DOMAINS_RESPONSE
+
+
+_DEFAULT_MODELS = ["gemma3:4b", "qwen2.5:7b", "gemma2:9b", "llama3:8b"]
+# (fetched_at, response) from the last successful /api/tags call
+_MODELS_CACHE: Optional[Tuple[float, Dict[str, Any]]] = None
+# Single-flight: concurrent misses wait for one /api/tags request instead of each sending their own
+_MODELS_CACHE_LOCK = asyncio.Lock()
 
 
 @app.get("/api/models")
-def get_ollama_models() -> Dict[str, Any]:
+async def get_ollama_models(request: Request) -> Dict[str, Any]:
 	"""Get list of available Ollama models"""
+	global _MODELS_CACHE
+	cached = _MODELS_CACHE
+	if cached is not None and time.monotonic() - cached[0] <= config.MODELS_CACHE_TTL_SECONDS:
+		return cached[1]
 	try:
-		import subprocess
-		import json
-		
-		# Try ollama list with JSON first
-		result = subprocess.run(
-			["ollama", "list", "--json"], 
-			capture_output=True, 
-			text=True, 
-			timeout=10
-		)
-		
-		if result.returncode == 0:
-			try:
-				models_data = json.loads(result.stdout)
-				models = []
-				
-				# Extract model names
-				if "models" in models_data:
-					for model in models_data["models"]:
-						if "name" in model:
-							models.append(model["name"])
-				
-				return {
+		async with _MODELS_CACHE_LOCK:
+			cached = _MODELS_CACHE
+			if cached is None or time.monotonic() - cached[0] > config.MODELS_CACHE_TTL_SECONDS:
+				resp = await request.app.state.ollama_http.get("/api/tags")
+				resp.raise_for_status()
+				models = [m["name"] for m in orjson.loads(resp.content).get("models", []) if "name" in m]
+				cached = (time.monotonic(), {
 					"status": "success",
 					"models": models,
 					"count": len(models)
-				}
-			except json.JSONDecodeError:
-				pass  # Fall through to text parsing
-		
-		# Try regular ollama list (text format)
-		result = subprocess.run(
-			["ollama", "list"], 
-			capture_output=True, 
-			text=True, 
-			timeout=10
-		)
-		
-		if result.returncode == 0:
-			# Parse text output
-			lines = result.stdout.strip().split('\n')
-			models = []
-			for line in lines[1:]:  # Skip header line
-				if line.strip():
-					parts = line.split()
-					if parts:
-						model_name = parts[0]  # First column is model name
-						# Filter out system models and keep only main models
-						if not model_name.startswith('.') and ':' in model_name:
-							models.append(model_name)
-			
-			return {
-				"status": "success", 
-				"models": models,
-				"count": len(models)
-			}
-		else:
-			# Return some default models if ollama command fails
-			default_models = ["gemma3:4b", "qwen2.5:7b", "gemma2:9b", "llama3:8b"]
-			return {
-				"status": "fallback",
-				"models": default_models,
-				"count": len(default_models),
-				"error": "Could not connect to Ollama, showing common models"
-			}
-			
+				})
+				_MODELS_CACHE = cached
+		return cached[1]
 	except Exception as e:
 		# Return fallback models in case of any error
-		default_models = ["gemma3:4b", "qwen2.5:7b", "gemma2:9b", "llama3:8b"]
 		return {
 			"status": "error",
-			"models": default_models,
-			"count": len(default_models),
+			"models": _DEFAULT_MODELS,
+			"count": len(_DEFAULT_MODELS),
 			"error": str(e)
 		}
 
 
+def _extraction_response(kwargs: Dict[str, Any], result: Dict[str, Any]) -> ORJSONResponse:
+	# Entities/relationships come from ensure_extraction_shape and already match the response models,
+	# so they are serialised as-is instead of being validated into pydantic objects and dumped again
+	return ORJSONResponse({
+		"text": kwargs["text"],
+		"language": kwargs["language"],
+		"model": kwargs["model"],
+		"entities": result.get("entities", []),
+		"relationships": result.get("relationships", []),
+	})
+
+
+def _model_response(model: BaseModel) -> Response:
+	"""Serialise an already-validated model in one step (pydantic-core to JSON bytes), skipping FastAPI's re-validation."""
+	return Response(content=model.model_dump_json(), media_type="application/json")
+
+
+def _model_analysis(analysis: Dict[str, Any]) -> Dict[str, Any]:
+	return {**analysis, "confidence_score": analysis.get("confidence_score"), "reasoning": analysis.get("reasoning")}
+
+
 @app.post("/api/extract", response_model=ExtractionResponse)
-def extract(req: ExtractionRequest) -> ExtractionResponse:
+async def extract(req: ExtractionRequest) -> ORJSONResponse:
 	if not req.text or not req.text.strip():
 		raise HTTPException(status_code=400, detail="'text' is required")
 
-	language = (req.language or "fa").lower()
-	model_name = req.model or config.OLLAMA_MODEL
-	temperature = req.temperature if req.temperature is not None else config.TEMPERATURE
-	max_output_tokens = req.max_output_tokens if req.max_output_tokens is not None else config.MAX_OUTPUT_TOKENS
+	kwargs = extraction_kwargs(
+		req.text,
+		language=req.language,
+		schema=req.schema,
+		examples=req.examples,
+		model=req.model,
+		temperature=req.temperature,
+		max_output_tokens=req.max_output_tokens,
+	)
+	return _extraction_response(kwargs, await do_extraction(kwargs))
 
-	# Check if user is asking about the AI assistant
-	ai_question_keywords = [
-		'تو کی هستی', 'تو کجا توسعه پیدا کردی', 'چه کسی نوشته ات', 'چه کسی توسعه داده ات', 'علی سلیمی کیه؟',
-		'کجا آموزش دیده ای', 'توسعه دهنده تو کیست', 'نویسنده تو کیست', 'چه کسی تو را ساخته','نویسنده تو چه کسی است' ,
-		'who are you', 'who created you', 'who developed you', 'who wrote you',
-		'where were you developed', 'where were you trained'
-	]
-	is_ai_question = any(keyword in req.text.lower() for keyword in ai_question_keywords)
-	
-	if is_ai_question:
-		ai_response = """من دستیار هوش مصنوعی هستم که در مرکز مدیریت و تحلیل داده فراجا و اداره مهندسی داده توسعه داده شده و آموزش دیده‌ام. توسعه‌دهنده من، سرهنگ مهندس علی سلیمی است و آماده‌ام تا شما را راهنمایی کنم."""
-		return ExtractionResponse(
-			text=req.text,
-			language=language,
-			model=model_name,
-			entities=[{
-				"text": ai_response,
-				"label": "AI_Response",
-				"start": 0,
-				"end": len(ai_response),
-				"confidence": 1.0
-			}],
-			relationships=[]
-		)
 
-	result = run_extraction(
-		text=req.text,
-		language=language,
-		schema=req.schema or "general",
-		domain="general",  # Add domain parameter
-		examples=[e.model_dump() for e in (req.examples or [])],
-		model=model_name,
-		temperature=temperature,
-		max_output_tokens=max_output_tokens,
-		request_timeout_seconds=config.REQUEST_TIMEOUT_SECONDS,
-		num_ctx=config.NUM_CTX,
-		max_input_chars=config.MAX_INPUT_CHARS,
-		chunk_overlap_chars=config.CHUNK_OVERLAP_CHARS,
-		max_chunks=config.MAX_CHUNKS,
-	)
+@app.post("/api/extract_stream")
+async def extract_stream(req: ExtractionRequest) -> StreamingResponse:
+	"""Like /api/extract, but streams newline-delimited JSON: each line holds the new entities and
+	relationships of one finished chunk, so long documents show results before the last chunk is done."""
+	if not req.text or not req.text.strip():
+		raise HTTPException(status_code=400, detail="'text' is required")
 
-	return ExtractionResponse(
-		text=req.text,
-		language=language,
-		model=model_name,
-		entities=result.get("entities", []),
-		relationships=result.get("relationships", []),
+	kwargs = extraction_kwargs(
+		req.text,
+		language=req.language,
+		schema=req.schema,
+		examples=req.examples,
+		model=req.model,
+		temperature=req.temperature,
+		max_output_tokens=req.max_output_tokens,
+	)
+	# GZipMiddleware would hold small lines back in its compression buffer; an explicit encoding makes it pass them through
+	return StreamingResponse(
+		stream_extraction(kwargs),
+		media_type="application/x-ndjson",
+		headers={"Content-Encoding": "identity"},
 	)
 
 
 @app.post("/api/extract_file", response_model=ExtractionResponse)
 async def extract_file(
+	request: Request,
 	file: UploadFile = File(...),
 	language: str = Form("fa"),
 	schema: str = Form("general"),
 	model: Optional[str] = Form(None),
 	temperature: Optional[float] = Form(None),
 	max_output_tokens: Optional[int] = Form(None),
-) -> ExtractionResponse:
-	data = await file.read()
-	text = extract_text_from_file(file.filename, data)
+) -> ORJSONResponse:
+	# Chunked uploads carry no Content-Length, so check the spooled size as well
+	if file.size is not None and file.size > config.MAX_UPLOAD_BYTES:
+		raise HTTPException(status_code=413, detail=_UPLOAD_TOO_LARGE)
+
+	pool = request.app.state.file_pool
+	if pool is None:
+		# UploadFile is already spooled to a temp file; parse from it rather than reading it into memory
+		text = await run_in_threadpool(extract_text_from_file, file.filename, file.file, max_chars=config.MAX_FILE_CHARS)
+	else:
+		# Worker processes need picklable arguments, so the upload is passed as bytes
+		data = await file.read()
+		text = await asyncio.get_running_loop().run_in_executor(
+			pool, partial(extract_text_from_file, file.filename, data, max_chars=config.MAX_FILE_CHARS)
+		)
 	if not text or not text.strip():
 		raise HTTPException(status_code=400, detail="File is empty or unsupported format")
 
-	language = (language or "fa").lower()
-	model_name = model or config.OLLAMA_MODEL
-	temperature = temperature if temperature is not None else config.TEMPERATURE
-	max_output_tokens = max_output_tokens if max_output_tokens is not None else config.MAX_OUTPUT_TOKENS
-
-	# Check if user is asking about the AI assistant
-	ai_question_keywords = [
-		'تو کی هستی', 'تو کجا توسعه پیدا کردی', 'چه کسی نوشته ات', 'چه کسی توسعه داده ات',
-		'کجا آموزش دیده ای', 'توسعه دهنده تو کیست', 'نویسنده تو کیست', 'چه کسی تو را ساخته',
-		'who are you', 'who created you', 'who developed you', 'who wrote you',
-		'where were you developed', 'where were you trained'
-	]
-	is_ai_question = any(keyword in text.lower() for keyword in ai_question_keywords)
-	
-	if is_ai_question:
-		ai_response = """من دستیار هوش مصنوعی هستم که در مرکز مدیریت و تحلیل داده فراجا و اداره مهندسی داده توسعه داده شده و آموزش دیده‌ام. توسعه‌دهنده من، سرهنگ مهندس علی سلیمی است و آماده‌ام تا شما را راهنمایی کنم."""
-		return ExtractionResponse(
-			text=text,
-			language=language,
-			model=model_name,
-			entities=[{
-				"text": ai_response,
-				"label": "AI_Response",
-				"start": 0,
-				"end": len(ai_response),
-				"confidence": 1.0
-			}],
-			relationships=[]
-		)
-
-	result = run_extraction(
-		text=text,
+	kwargs = extraction_kwargs(
+		text,
 		language=language,
-		schema=schema or "general",
-		domain="general",  # Add domain parameter
-		examples=[],
-		model=model_name,
+		schema=schema,
+		examples=None,
+		model=model,
 		temperature=temperature,
 		max_output_tokens=max_output_tokens,
-		request_timeout_seconds=config.REQUEST_TIMEOUT_SECONDS,
-		num_ctx=config.NUM_CTX,
-		max_input_chars=config.MAX_INPUT_CHARS,
-		chunk_overlap_chars=config.CHUNK_OVERLAP_CHARS,
-		max_chunks=config.MAX_CHUNKS,
-	)
-
-	return ExtractionResponse(
-		text=text,
-		language=language,
-		model=model_name,
-		entities=result.get("entities", []),
-		relationships=result.get("relationships", []),
 	)
+	return _extraction_response(kwargs, await do_extraction(kwargs))
 
 
 @app.post("/api/report", response_class=HTMLResponse)
-def report(req: ExtractionRequest) -> HTMLResponse:
+async def report(req: ExtractionRequest) -> StreamingResponse:
 	if not req.text or not req.text.strip():
 		raise HTTPException(status_code=400, detail="'text' is required")
 
-	language = (req.language or "fa").lower()
-	model_name = req.model or config.OLLAMA_MODEL
-	temperature = req.temperature if req.temperature is not None else config.TEMPERATURE
-	max_output_tokens = req.max_output_tokens if req.max_output_tokens is not None else config.MAX_OUTPUT_TOKENS
+	kwargs = extraction_kwargs(
+		req.text,
+		language=req.language,
+		schema=req.schema,
+		examples=req.examples,
+		model=req.model,
+		temperature=req.temperature,
+		max_output_tokens=req.max_output_tokens,
+	)
+	result = await do_extraction(kwargs, ai_shortcut=False)
 
-	result = run_extraction(
-		text=req.text,
-		language=language,
-		schema=req.schema or "general",
-		domain="general",  # Add domain parameter
-		examples=[e.model_dump() for e in (req.examples or [])],
-		model=model_name,
-		temperature=temperature,
-		max_output_tokens=max_output_tokens,
-		request_timeout_seconds=config.REQUEST_TIMEOUT_SECONDS,
-		num_ctx=config.NUM_CTX,
-		max_input_chars=config.MAX_INPUT_CHARS,
-		chunk_overlap_chars=config.CHUNK_OVERLAP_CHARS,
-		max_chunks=config.MAX_CHUNKS,
+	# Streamed row by row so large reports are never held in memory as one string
+	return StreamingResponse(
+		iter_html_report(source_text=req.text, extraction=result, language=kwargs["language"], model=kwargs["model"]),
+		media_type="text/html; charset=utf-8",
 	)
 
-	html = generate_html_report(source_text=req.text, extraction=result, language=language, model=model_name)
-	return HTMLResponse(content=html)
+
+# Validated once; each AI-question reply only swaps in the model name (shallow copy)
+_AI_ANALYSIS = ModelAnalysis(model_name="", entities=AI_RESPONSE_ENTITIES, relationships=[])
 
 
 @app.post("/api/multi_extract", response_model=MultiModelResponse)
-def multi_extract(req: MultiModelRequest) -> MultiModelResponse:
+async def multi_extract(req: MultiModelRequest) -> MultiModelResponse:
 	if not req.text or not req.text.strip():
 		raise HTTPException(status_code=400, detail="'text' is required")
 
@@ -303,57 +299,21 @@ def multi_extract(req: MultiModelRequest) -> MultiModelResponse:
 	max_output_tokens = req.max_output_tokens if req.max_output_tokens is not None else config.MAX_OUTPUT_TOKENS
 
 	# Check if user is asking about the AI assistant
-	ai_question_keywords = [
-		'تو کی هستی', 'تو کجا توسعه پیدا کردی', 'چه کسی نوشته ات', 'چه کسی توسعه داده ات',
-		'کجا آموزش دیده ای', 'توسعه دهنده تو کیست', 'نویسنده تو کیست', 'چه کسی تو را ساخته',
-		'who are you', 'who created you', 'who developed you', 'who wrote you',
-		'where were you developed', 'where were you trained'
-	]
-	is_ai_question = any(keyword in req.text.lower() for keyword in ai_question_keywords)
-	
-	if is_ai_question:
-		ai_response = """من دستیار هوش مصنوعی هستم که در مرکز مدیریت و تحلیل داده فراجا و اداره مهندسی داده توسعه داده شده و آموزش دیده‌ام. توسعه‌دهنده من، سرهنگ مهندس علی سلیمی است و آماده‌ام تا شما را راهنمایی کنم."""
-		return MultiModelResponse(
+	if is_ai_question(req.text):
+		return _model_response(MultiModelResponse(
 			text=req.text,
 			language=language,
 			domain=domain,
-			first_analysis=ModelAnalysis(
-				entities=[{
-					"text": ai_response,
-					"label": "AI_Response",
-					"start": 0,
-					"end": len(ai_response),
-					"confidence": 1.0
-				}],
-				relationships=[]
-			),
-			second_analysis=ModelAnalysis(
-				entities=[{
-					"text": ai_response,
-					"label": "AI_Response",
-					"start": 0,
-					"end": len(ai_response),
-					"confidence": 1.0
-				}],
-				relationships=[]
-			),
-			final_analysis=ModelAnalysis(
-				entities=[{
-					"text": ai_response,
-					"label": "AI_Response",
-					"start": 0,
-					"end": len(ai_response),
-					"confidence": 1.0
-				}],
-				relationships=[]
-			),
+			first_analysis=_AI_ANALYSIS.model_copy(update={"model_name": req.model_first}),
+			second_analysis=_AI_ANALYSIS.model_copy(update={"model_name": req.model_second}),
+			final_analysis=_AI_ANALYSIS.model_copy(update={"model_name": req.model_referee}),
 			agreement_score=1.0,
 			conflicting_entities=[],
 			conflicting_relationships=[]
-		)
+		))
 
 	try:
-		result = run_multi_model_analysis(
+		result = await do_multi_model_analysis(
 			text=req.text,
 			language=language,
 			domain=domain,
@@ -366,23 +326,136 @@ def multi_extract(req: MultiModelRequest) -> MultiModelResponse:
 			num_ctx=config.NUM_CTX,
 		)
 
-		return MultiModelResponse(
-			text=result["text"],
-			language=result["language"],
-			domain=result["domain"],
-			first_analysis=ModelAnalysis(**result["first_analysis"]),
-			second_analysis=ModelAnalysis(**result["second_analysis"]),
-			final_analysis=ModelAnalysis(**result["final_analysis"]),
-			agreement_score=result["agreement_score"],
-			conflicting_entities=result["conflicting_entities"],
-			conflicting_relationships=result["conflicting_relationships"],
-		)
+		# Already shaped by langextract; skip re-validating every entity (see _extraction_response)
+		return ORJSONResponse({
+			"text": result["text"],
+			"language": result["language"],
+			"domain": result["domain"],
+			"first_analysis": _model_analysis(result["first_analysis"]),
+			"second_analysis": _model_analysis(result["second_analysis"]),
+			"final_analysis": _model_analysis(result["final_analysis"]),
+			"agreement_score": result["agreement_score"],
+			"conflicting_entities": result["conflicting_entities"],
+			"conflicting_relationships": result["conflicting_relationships"],
+		})
 	except Exception as e:
 		raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
 
+# Chat system prompt pieces; the base prompt only varies by domain, language and mode.
+# It is the static prefix of every chat request, so it stays byte-identical across turns
+# and Ollama can reuse its prompt cache. Per-turn history context goes in the final user
+# turn, after the history, so it never shifts that prefix.
+_CHAT_DOMAIN_TITLES = {
+	"police": "دستیار هوشمند امنیتی و پلیسی",
+	"legal": "دستیار هوشمند حقوقی", 
+	"medical": "دستیار هوشمند پزشکی",
+	"general": "دستیار هوشمند عمومی"
+}
+
+_CHAT_DOMAIN_EXPERTISE = {
+	"police": "شما متخصص تحلیل متون امنیتی، پلیسی، جرایم، تهدیدات و موارد مشکوک هستید.",
+	"legal": "شما متخصص تحلیل متون حقوقی، قوانین، قراردادها، دادگاه‌ها و مسائل قانونی هستید.",
+	"medical": "شما متخصص تحلیل متون پزشکی، تشخیص‌ها، درمان‌ها، داروها و مسائل سلامت هستید.",
+	"general": "شما متخصص تحلیل متون عمومی و استخراج اطلاعات ساختاریافته هستید."
+}
+
+
+@lru_cache(maxsize=32)
+def _render_chat_system_prompt(domain: str, language: str, analysis_mode: str) -> str:
+	title = _CHAT_DOMAIN_TITLES.get(domain, _CHAT_DOMAIN_TITLES["general"])
+	expertise = _CHAT_DOMAIN_EXPERTISE.get(domain, _CHAT_DOMAIN_EXPERTISE["general"])
+	analysis_mode_desc = "با داوری چندمدله" if analysis_mode == "multi" else ""
+	return f"""شما {title} {analysis_mode_desc} مرکز مدیریت و تحلیل داده فراجا هستید.
+{expertise}
+
+قوانین مهم برای پاسخ‌دهی:
+1. همیشه سابقه مکالمه را در نظر بگیرید
+2. اگر کاربر به موضوعات قبلی اشاره می‌کند، از سابقه استفاده کنید
+3. پاسخ‌های خود را کوتاه، مفید و به زبان {language} ارائه دهید
+4. در صورت نیاز تحلیل متن یا نمودار ارائه دهید
+
+قابلیت‌های ویژه شما:
+- تحلیل متون و استخراج موجودیت‌ها و روابط
+- کشیدن نمودار برای نمایش داده‌ها
+- پاسخ‌دهی بر اساس سابقه مکالمه
+- ارجاع به پیام‌های قبلی
+
+برای کشیدن نمودار، از فرمت زیر استفاده کنید:
+```chart
+{{
+  "type": "bar|line|pie|doughnut",
+  "title": "عنوان نمودار",
+  "labels": ["برچسب1", "برچسب2", "برچسب3"],
+  "datasets": [
+    {{
+      "label": "نام مجموعه داده",
+      "data": [10, 20, 30],
+      "backgroundColor": ["#3b82f6", "#10b981", "#f59e0b"]
+    }}
+  ]
+}}
+```
+
+"""
+
+
+_CHAT_LANGUAGES = ("fa", "en")
+_CHAT_SYSTEM_PROMPTS: Dict[Tuple[str, str, str], str] = {
+	(domain, language, mode): _render_chat_system_prompt(domain, language, mode)
+	for domain in _CHAT_DOMAIN_TITLES
+	for language in _CHAT_LANGUAGES
+	for mode in ("single", "multi")
+}
+
+
+def _chat_system_prompt(domain: str, language: str, analysis_mode: str) -> str:
+	"""Prerendered system prompt; unknown domains fall back to general, other languages are rendered on demand."""
+	if domain not in _CHAT_DOMAIN_TITLES:
+		domain = "general"
+	mode = "multi" if analysis_mode == "multi" else "single"
+	prompt = _CHAT_SYSTEM_PROMPTS.get((domain, language, mode))
+	if prompt is None:
+		prompt = _render_chat_system_prompt(domain, language, mode)
+	return prompt
+
+
+# Patterns used to pull names and question subjects out of the conversation history
+_NAME_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (r'نام\s+من\s+(\w+)', r'اسم\s+من\s+(\w+)', r'من\s+(\w+)\s+هستم', r'(\w+)\s+هستم')]
+_QUESTION_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (r'(\w+)\s+چیه', r'(\w+)\s+کیست', r'(\w+)\s+کجاست', r'چطور\s+(\w+)')]
+_TOPIC_KEYWORDS = ['مشکل', 'خطا', 'اشتباه', 'کمک', 'راهنمایی', 'تحلیل', 'بررسی', 'سوال', 'پاسخ', 'توضیح']
+_CHART_RE = re.compile(r'```chart\s*\n(.*?)\n```', re.DOTALL)
+
+
+def _log_history(message_history: List[Dict[str, str]]) -> None:
+	"""Debug summary of the incoming conversation (only called when DEBUG is enabled)."""
+	logger.debug("📝 Received message history: %d messages", len(message_history))
+	user_count = 0
+	parts: List[str] = []
+	for i, msg in enumerate(message_history):
+		logger.debug("  %d. %s: %s...", i + 1, msg["role"], msg["content"][:50])
+		if msg["role"] == "user":
+			user_count += 1
+		parts.append(msg["content"])
+	first, last = message_history[0], message_history[-1]
+	logger.debug("📝 First message: %s: %s...", first["role"], first["content"][:30])
+	logger.debug("📝 Last message: %s: %s...", last["role"], last["content"][:30])
+	logger.debug("📝 Message analysis: %d user, %d assistant", user_count, len(message_history) - user_count)
+	all_content = " ".join(parts)
+	if 'نام' in all_content or 'اسم' in all_content:
+		logger.debug("📝 Contains name/identity information")
+	if 'مشکل' in all_content or 'خطا' in all_content:
+		logger.debug("📝 Contains problem/error information")
+	if '؟' in all_content or '?' in all_content:
+		logger.debug("📝 Contains questions")
+
+
+_ANALYSIS_KEYWORDS = ['تحلیل', 'استخراج', 'موجودیت', 'رابطه', 'analyze', 'extract', 'بررسی', 'شناسایی']
+_ANALYSIS_KEYWORDS_RE = re.compile("|".join(map(re.escape, _ANALYSIS_KEYWORDS)), re.IGNORECASE)
+
+
 @app.post("/api/chat", response_model=ChatResponse)
-def chat(req: ChatRequest) -> ChatResponse:
+async def chat(req: ChatRequest) -> ChatResponse:
 	"""Chat endpoint for conversational analysis with single/multi model support"""
 	if not req.message or not req.message.strip():
 		raise HTTPException(status_code=400, detail="'message' is required")
@@ -393,63 +466,35 @@ def chat(req: ChatRequest) -> ChatResponse:
 	model_name = req.model or config.OLLAMA_MODEL
 
 	try:
-		# Build a conversational prompt based on domain
-		domain_titles = {
-			"police": "دستیار هوشمند امنیتی و پلیسی",
-			"legal": "دستیار هوشمند حقوقی", 
-			"medical": "دستیار هوشمند پزشکی",
-			"general": "دستیار هوشمند عمومی"
-		}
-		
-		domain_expertise = {
-			"police": "شما متخصص تحلیل متون امنیتی، پلیسی، جرایم، تهدیدات و موارد مشکوک هستید.",
-			"legal": "شما متخصص تحلیل متون حقوقی، قوانین، قراردادها، دادگاه‌ها و مسائل قانونی هستید.",
-			"medical": "شما متخصص تحلیل متون پزشکی، تشخیص‌ها، درمان‌ها، داروها و مسائل سلامت هستید.",
-			"general": "شما متخصص تحلیل متون عمومی و استخراج اطلاعات ساختاریافته هستید."
-		}
-		
-		title = domain_titles.get(domain, domain_titles["general"])
-		expertise = domain_expertise.get(domain, domain_expertise["general"])
-		
-		analysis_mode_desc = "با داوری چندمدله" if analysis_mode == "multi" else ""
-		
-		# Enhanced system prompt that considers conversation history
+		# Notes on the conversation so far; they change every turn, so they go with the new message
 		history_context = ""
 		if req.message_history and len(req.message_history) > 0:
-			# Analyze conversation history to provide better context
-			user_messages = [msg.content for msg in req.message_history if msg.role == "user"]
-			assistant_messages = [msg.content for msg in req.message_history if msg.role == "assistant"]
-			
-			# Extract key topics and names mentioned
-			all_content = " ".join([msg.content for msg in req.message_history])
-			key_topics = []
-			
-			# Look for names, places, and important topics
-			import re
-			name_patterns = [r'نام\s+من\s+(\w+)', r'اسم\s+من\s+(\w+)', r'من\s+(\w+)\s+هستم', r'(\w+)\s+هستم']
-			for pattern in name_patterns:
-				matches = re.findall(pattern, all_content, re.IGNORECASE)
-				key_topics.extend(matches)
+			# Analyze conversation history to provide better context (single pass)
+			history = req.message_history
+			content_parts: List[str] = []
+			total_chars = 0
+			for msg in history:
+				content_parts.append(msg.content)
+				total_chars += len(msg.content)
+			all_content = " ".join(content_parts)
+			all_content_lower = all_content.lower()
 			
-			# Look for important topics
-			topic_keywords = ['مشکل', 'خطا', 'اشتباه', 'کمک', 'راهنمایی', 'تحلیل', 'بررسی', 'سوال', 'پاسخ', 'توضیح']
-			for keyword in topic_keywords:
-				if keyword in all_content.lower():
-					key_topics.append(keyword)
-			
-			# Look for questions
-			question_patterns = [r'(\w+)\s+چیه', r'(\w+)\s+کیست', r'(\w+)\s+کجاست', r'چطور\s+(\w+)']
-			for pattern in question_patterns:
-				matches = re.findall(pattern, all_content, re.IGNORECASE)
-				key_topics.extend(matches)
+			# Extract key topics and names mentioned; dict keeps first-seen order so the prompt is stable
+			key_topics: Dict[str, None] = {}
+			for pattern in _NAME_PATTERNS:
+				key_topics.update(dict.fromkeys(pattern.findall(all_content)))
+			for keyword in _TOPIC_KEYWORDS:
+				if keyword in all_content_lower:
+					key_topics[keyword] = None
+			for pattern in _QUESTION_PATTERNS:
+				key_topics.update(dict.fromkeys(pattern.findall(all_content)))
 			
 			topics_context = ""
 			if key_topics:
-				topics_context = f"\nموضوعات مهم در مکالمه: {', '.join(set(key_topics))}"
+				topics_context = f"\nموضوعات مهم در مکالمه: {', '.join(key_topics)}"
 			
 			# Analyze conversation length and complexity
-			total_chars = sum(len(msg.content) for msg in req.message_history)
-			avg_length = total_chars / len(req.message_history) if req.message_history else 0
+			avg_length = total_chars / len(history)
 			
 			complexity_context = ""
 			if len(req.message_history) > 10:
@@ -471,62 +516,23 @@ def chat(req: ChatRequest) -> ChatResponse:
 تعداد پیام‌های قبلی: {len(req.message_history)}
 توجه: این مکالمه ادامه دارد، پس حتماً سابقه را در نظر بگیرید."""
 		
-		system_prompt = f"""شما {title} {analysis_mode_desc} مرکز مدیریت و تحلیل داده فراجا هستید.
-{expertise}
-
-قوانین مهم برای پاسخ‌دهی:
-1. همیشه سابقه مکالمه را در نظر بگیرید
-2. اگر کاربر به موضوعات قبلی اشاره می‌کند، از سابقه استفاده کنید
-3. پاسخ‌های خود را کوتاه، مفید و به زبان {language} ارائه دهید
-4. در صورت نیاز تحلیل متن یا نمودار ارائه دهید
-
-قابلیت‌های ویژه شما:
-- تحلیل متون و استخراج موجودیت‌ها و روابط
-- کشیدن نمودار برای نمایش داده‌ها
-- پاسخ‌دهی بر اساس سابقه مکالمه
-- ارجاع به پیام‌های قبلی
-
-برای کشیدن نمودار، از فرمت زیر استفاده کنید:
-```chart
-{{
-  "type": "bar|line|pie|doughnut",
-  "title": "عنوان نمودار",
-  "labels": ["برچسب1", "برچسب2", "برچسب3"],
-  "datasets": [
-    {{
-      "label": "نام مجموعه داده",
-      "data": [10, 20, 30],
-      "backgroundColor": ["#3b82f6", "#10b981", "#f59e0b"]
-    }}
-  ]
-}}
-```
-
-{history_context}"""
+		system_prompt = _chat_system_prompt(domain, language, analysis_mode)
 
 		# Check if user is asking about the AI assistant
-		ai_question_keywords = [
-			'تو کی هستی', 'تو کجا توسعه پیدا کردی', 'چه کسی نوشته ات', 'چه کسی توسعه داده ات',
-			'کجا آموزش دیده ای', 'توسعه دهنده تو کیست', 'نویسنده تو کیست', 'چه کسی تو را ساخته',
-			'who are you', 'who created you', 'who developed you', 'who wrote you',
-			'where were you developed', 'where were you trained'
-		]
-		is_ai_question = any(keyword in req.message.lower() for keyword in ai_question_keywords)
-		
-		if is_ai_question:
-			ai_response = """من دستیار هوش مصنوعی هستم که در مرکز مدیریت و تحلیل داده فراجا و اداره مهندسی داده توسعه داده شده و آموزش دیده‌ام. توسعه‌دهنده من، سرهنگ مهندس علی سلیمی است و آماده‌ام تا شما را راهنمایی کنم."""
-			return ChatResponse(message=ai_response)
+		if is_ai_question(req.message):
+			return _model_response(ChatResponse(message=AI_RESPONSE))
 		
 		# Check if user wants analysis
-		analysis_keywords = ['تحلیل', 'استخراج', 'موجودیت', 'رابطه', 'analyze', 'extract', 'بررسی', 'شناسایی']
-		wants_analysis = any(keyword in req.message.lower() for keyword in analysis_keywords)
+		wants_analysis = _ANALYSIS_KEYWORDS_RE.search(req.message) is not None
 
-		if wants_analysis and len(req.message) > 50:
+		if wants_analysis and len(req.message) > config.MIN_ANALYSIS_CHARS:
+			# Short inputs yield few entities; don't reserve the full output budget for them
+			analysis_max_tokens = min(512, max(256, 4 * len(req.message)))
 			# Perform analysis based on mode
 			try:
 				if analysis_mode == "multi" and req.model_first and req.model_second and req.model_referee:
 					# Multi-model analysis
-					analysis_result = run_multi_model_analysis(
+					analysis_result = await do_multi_model_analysis(
 						text=req.message,
 						language=language,
 						domain=domain,
@@ -534,7 +540,7 @@ def chat(req: ChatRequest) -> ChatResponse:
 						model_second=req.model_second,
 						model_referee=req.model_referee,
 						temperature=0.1,
-						max_output_tokens=512,
+						max_output_tokens=analysis_max_tokens,
 						request_timeout_seconds=config.REQUEST_TIMEOUT_SECONDS,
 						num_ctx=config.NUM_CTX,
 					)
@@ -566,21 +572,21 @@ def chat(req: ChatRequest) -> ChatResponse:
 						"conflicting_relationships": analysis_result["conflicting_relationships"],
 					}
 
-					return ChatResponse(
+					return _model_response(ChatResponse(
 						message=response_message,
 						analysis=formatted_result,
 						analysisMode="multi"
-					)
+					))
 				else:
 					# Single model analysis
-					analysis_result = run_extraction(
-						text=req.message,
+					analysis_result = await do_extraction(extraction_kwargs(
+						req.message,
 						language=language,
 						domain=domain,
 						model=model_name,
 						temperature=0.1,
-						max_output_tokens=512
-					)
+						max_output_tokens=analysis_max_tokens,
+					))
 					
 					entities_count = len(analysis_result.get("entities", []))
 					relationships_count = len(analysis_result.get("relationships", []))
@@ -600,47 +606,26 @@ def chat(req: ChatRequest) -> ChatResponse:
 						"relationships": analysis_result.get("relationships", []),
 					}
 
-					return ChatResponse(
+					return _model_response(ChatResponse(
 						message=response_message,
 						analysis=formatted_result,
 						analysisMode="single"
-					)
+					))
 			except Exception as e:
-				print(f"Analysis failed: {str(e)}")
-				pass  # Fall back to regular chat
+				logger.warning("Analysis failed: %s", e)  # Fall back to regular chat
 
 		# Regular chat response with message history support
 		
 		# Convert message history to the format expected by ollama
-		message_history = []
-		if req.message_history:
-			for msg in req.message_history:
-				message_history.append({
-					"role": msg.role,
-					"content": msg.content
-				})
-			print(f"📝 Received message history: {len(message_history)} messages")
-			for i, msg in enumerate(message_history):
-				print(f"  {i+1}. {msg['role']}: {msg['content'][:50]}...")
-			
-			# Validate message history format
-			if len(message_history) > 0:
-				print(f"📝 First message: {message_history[0]['role']}: {message_history[0]['content'][:30]}...")
-				print(f"📝 Last message: {message_history[-1]['role']}: {message_history[-1]['content'][:30]}...")
-				
-				# Analyze message patterns
-				user_messages = [msg for msg in message_history if msg['role'] == 'user']
-				assistant_messages = [msg for msg in message_history if msg['role'] == 'assistant']
-				print(f"📝 Message analysis: {len(user_messages)} user, {len(assistant_messages)} assistant")
-				
-				# Check for important patterns
-				all_content = " ".join([msg['content'] for msg in message_history])
-				if 'نام' in all_content or 'اسم' in all_content:
-					print("📝 Contains name/identity information")
-				if 'مشکل' in all_content or 'خطا' in all_content:
-					print("📝 Contains problem/error information")
-				if '؟' in all_content or '?' in all_content:
-					print("📝 Contains questions")
+		message_history = [{"role": msg.role, "content": msg.content} for msg in req.message_history or []]
+		# Bounded, but only cut back every few turns so Ollama can reuse the cached prompt prefix
+		message_history = trim_history(
+			message_history,
+			min_window=config.CHAT_HISTORY_MIN_WINDOW,
+			reset_at=config.CHAT_HISTORY_RESET_AT,
+		)
+		if message_history and logger.isEnabledFor(logging.DEBUG):
+			_log_history(message_history)
 		
 		# Adjust parameters based on conversation complexity
 		temperature = 0.7
@@ -650,11 +635,12 @@ def chat(req: ChatRequest) -> ChatResponse:
 			# For long conversations, use lower temperature for consistency
 			temperature = 0.5
 			max_tokens = 512  # Allow longer responses for complex conversations
-			print("📝 Adjusting parameters for long conversation")
+			logger.debug("📝 Adjusting parameters for long conversation")
 		
-		response = chat_conversational(
+		response = await run_llm(
+			chat_conversational,
 			system_prompt=system_prompt,
-			user_message=req.message,
+			user_message=f"{history_context.strip()}\n\n{req.message}" if history_context else req.message,
 			model=model_name,
 			message_history=message_history if message_history else None,
 			temperature=temperature,
@@ -668,174 +654,65 @@ def chat(req: ChatRequest) -> ChatResponse:
 		
 		# Extract chart data if present
 		chart_data = None
-		import re
-		chart_pattern = r'```chart\s*\n(.*?)\n```'
-		chart_match = re.search(chart_pattern, clean_response, re.DOTALL)
+		# Most replies have no chart; a substring test avoids running the DOTALL regex over them
+		chart_match = _CHART_RE.search(clean_response) if "```chart" in clean_response else None
 		if chart_match:
 			try:
-				import json
 				chart_json = chart_match.group(1).strip()
-				chart_data = json.loads(chart_json)
+				chart_data = orjson.loads(chart_json)
 				# Remove chart block from response text
-				clean_response = re.sub(chart_pattern, '', clean_response, flags=re.DOTALL).strip()
-				print(f"📊 Chart data extracted: {chart_data.get('type', 'unknown')} chart")
-			except json.JSONDecodeError as e:
-				print(f"⚠️ Failed to parse chart JSON: {e}")
+				clean_response = _CHART_RE.sub('', clean_response).strip()
+				logger.debug("📊 Chart data extracted: %s chart", chart_data.get('type', 'unknown'))
+			except orjson.JSONDecodeError as e:
+				logger.warning("⚠️ Failed to parse chart JSON: %s", e)
 				chart_data = None
 
-		# Log response quality
-		print(f"📝 Response length: {len(clean_response)} characters")
-		if len(clean_response) < 10:
-			print("⚠️ Warning: Very short response")
-		elif len(clean_response) > 500:
-			print("📝 Long response generated")
-		
-		# Check if response seems to consider history
-		if req.message_history and len(req.message_history) > 0:
-			history_indicators = ['قبلاً', 'سابقاً', 'گفتم', 'گفتید', 'قبل', 'پیش', 'همان', 'همین']
-			considers_history = any(indicator in clean_response for indicator in history_indicators)
-			if considers_history:
-				print("✅ Response appears to consider conversation history")
-			else:
-				print("⚠️ Response may not be considering conversation history")
-			
-			# Check for specific references to previous messages
-			has_specific_reference = any(
-				msg.content in clean_response or 
-				(len(msg.content) > 10 and msg.content[:10] in clean_response)
-				for msg in req.message_history
-			)
-			if has_specific_reference:
-				print("✅ Response contains specific reference to previous message")
-			
-			# Check for continuity in conversation
-			has_continuity = any(
-				msg.role == 'user' and msg.content.lower()[:5] in clean_response.lower()
-				for msg in req.message_history
-			)
-			if has_continuity:
-				print("✅ Response shows good conversation continuity")
-			
-			# Check for context awareness
-			has_context_awareness = any(
-				msg.role == 'assistant' and msg.content.lower()[:5] in clean_response.lower()
-				for msg in req.message_history
-			)
-			if has_context_awareness:
-				print("✅ Response shows context awareness from previous assistant messages")
-			
-			# Overall conversation quality assessment
-			quality_indicators = [
-				considers_history,
-				has_specific_reference,
-				has_continuity,
-				has_context_awareness
-			]
-			quality_score = sum(quality_indicators)
-			print(f"📝 Conversation quality score: {quality_score}/4")
-			
-			if quality_score >= 3:
-				print("✅ Excellent conversation quality")
-			elif quality_score >= 2:
-				print("✅ Good conversation quality")
-			elif quality_score >= 1:
-				print("⚠️ Fair conversation quality")
-			else:
-				print("⚠️ Poor conversation quality - may not be considering history")
-			
-			# Store quality score for potential future use
-			if quality_score < 2:
-				print("⚠️ Consider improving conversation context or model parameters")
-			
-			# Log conversation summary for debugging
-			print(f"📝 Conversation summary: {len(req.message_history)} messages, quality: {quality_score}/4")
-			if req.message_history:
-				last_user_message = next((msg for msg in reversed(req.message_history) if msg.role == 'user'), None)
-				last_assistant_message = next((msg for msg in reversed(req.message_history) if msg.role == 'assistant'), None)
-				if last_user_message:
-					print(f"📝 Last user message: \"{last_user_message.content[:50]}...\"")
-				if last_assistant_message:
-					print(f"📝 Last assistant message: \"{last_assistant_message.content[:50]}...\"")
-			
-			# Log current message for context
-			print(f"📝 Current user message: \"{req.message[:50]}...\"")
-			print(f"📝 Current assistant response: \"{clean_response[:50]}...\"")
-			
-			# Log conversation flow for debugging
-			print(f"📝 Conversation flow: {len(req.message_history)} previous messages → current exchange")
-			if req.message_history:
-				user_messages = sum(1 for msg in req.message_history if msg.role == 'user')
-				assistant_messages = sum(1 for msg in req.message_history if msg.role == 'assistant')
-				print(f"📝 Previous flow: {user_messages} user messages, {assistant_messages} assistant messages")
-			
-			# Log conversation quality metrics
-			print(f"📝 Quality metrics: History consideration: {considers_history}, Specific refs: {has_specific_reference}, Continuity: {has_continuity}, Context awareness: {has_context_awareness}")
-			
-			# Log conversation health check
-			health_check = {
-				'has_history': len(req.message_history) > 0,
-				'has_quality': quality_score >= 2,
-				'has_continuity': has_continuity,
-				'has_context': has_context_awareness
-			}
-			print(f"📝 Conversation health check: {health_check}")
-			
-			if not health_check['has_history']:
-				print("⚠️ No conversation history available")
-			if not health_check['has_quality']:
-				print("⚠️ Low conversation quality detected")
-			
-			# Log conversation improvement suggestions
-			if quality_score < 2:
-				print("💡 Suggestions for better conversation quality:")
-				if not considers_history:
-					print("  - Model may need better history context")
-				if not has_specific_reference:
-					print("  - Model may need to reference specific previous messages")
-				if not has_continuity:
-					print("  - Model may need better conversation continuity")
-				if not has_context_awareness:
-					print("  - Model may need better context awareness")
-
-		return ChatResponse(message=clean_response, chart=chart_data)
+		return _model_response(ChatResponse(message=clean_response, chart=chart_data))
 
 	except Exception as e:
 		raise HTTPException(status_code=500, detail=f"Chat failed: {str(e)}")
 
 
+# Transcription is CPU-bound on the speech service; queue excess uploads here rather than overload it
+_STT_SEMAPHORE = asyncio.Semaphore(config.STT_MAX_CONCURRENCY)
+
+
 @app.post("/api/speech-to-text", response_model=SpeechToTextResponse)
 async def speech_to_text(
+	request: Request,
 	audio_file: UploadFile = File(...),
 	language: str = Form("fa"),
 	whisper_model_size: str = Form("base")
 ) -> SpeechToTextResponse:
 	"""Convert speech to text using the speech-to-text microservice"""
 	try:
-		# Prepare form data for the speech-to-text service
-		files = {"audio_file": (audio_file.filename, await audio_file.read(), audio_file.content_type)}
+		# Prepare form data for the speech-to-text service; the spooled upload is streamed, not read into memory
+		files = {"audio_file": (audio_file.filename, audio_file.file, audio_file.content_type)}
 		data = {"language": language, "model_size": whisper_model_size}
 		
 		# Call the speech-to-text microservice
-		async with httpx.AsyncClient(timeout=60.0) as client:
-			response = await client.post(
-				"http://localhost:8001/transcribe",
+		async with _STT_SEMAPHORE:
+			response = await request.app.state.http.post(
+				f"{config.SPEECH_SERVICE_URL}/transcribe",
 				files=files,
 				data=data
 			)
-			
-			if response.status_code != 200:
-				raise HTTPException(
-					status_code=response.status_code,
-					detail=f"Speech-to-text service error: {response.text}"
-				)
-			
-			result = response.json()
-			return SpeechToTextResponse(
-				text=result["text"],
-				language=result["language"],
-				confidence=result.get("confidence")
+		
+		if response.status_code != 200:
+			raise HTTPException(
+				status_code=response.status_code,
+				detail=f"Speech-to-text service error: {response.text}"
 			)
+		
+		result = orjson.loads(response.content)
+		return SpeechToTextResponse(
+			text=result["text"],
+			language=result["language"],
+			confidence=result.get("confidence")
+		)
 			
+	except HTTPException:
+		raise
 	except httpx.RequestError as e:
 		raise HTTPException(status_code=503, detail=f"Speech-to-text service unavailable: {str(e)}")
 	except Exception as e:
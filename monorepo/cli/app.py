@@ -7,6 +7,11 @@ import typer
 import requests
 from rich import print
 
+try:
+	import orjson
+except Exception:  # pragma: no cover
+	orjson = None  # type: ignore
+
 # Allow running without backend by using shared module directly
 import sys
 ROOT = Path(__file__).resolve().parents[1]
@@ -17,6 +22,9 @@ from langextract import run_extraction, generate_html_report  # type: ignore
 
 app = typer.Typer(help="LangExtract CLI")
 
+# Shared session so backend calls reuse one keep-alive connection
+_SESSION = requests.Session()
+
 
 @app.command()
 def extract(
@@ -28,6 +36,7 @@ def extract(
 	use_backend: bool = typer.Option(False, help="Call FastAPI backend instead of local extraction"),
 	backend_url: str = typer.Option("http://127.0.0.1:8000", help="Backend base URL"),
 	report_out: Optional[Path] = typer.Option(None, help="Output HTML report path"),
+	cache_dir: Optional[Path] = typer.Option(None, help="Cache model responses in this directory (default env LANGEXTRACT_CACHE_DIR)"),
 ):
 	"""Extract entities/relationships and optionally save an HTML report."""
 	if not text and file:
@@ -37,7 +46,7 @@ def extract(
 		raise typer.Exit(code=2)
 
 	if use_backend:
-		resp = requests.post(f"{backend_url}/api/extract", json={
+		resp = _SESSION.post(f"{backend_url}/api/extract", json={
 			"text": text,
 			"language": language,
 			"schema": schema,
@@ -46,7 +55,7 @@ def extract(
 		resp.raise_for_status()
 		data = resp.json()
 	else:
-		data = run_extraction(text=text, language=language, schema=schema, model=model)
+		data = run_extraction(text=text, language=language, schema=schema, model=model, cache_dir=str(cache_dir) if cache_dir else None)
 
 	print({"entities": len(data.get("entities", [])), "relationships": len(data.get("relationships", []))})
 
@@ -56,7 +65,7 @@ def extract(
 		print(f"[green]Saved report:[/green] {report_out}")
 
 	# stdout JSON
-	print(json.dumps(data, ensure_ascii=False))
+	print(orjson.dumps(data).decode() if orjson is not None else json.dumps(data, ensure_ascii=False))
 
 
 if __name__ == "__main__":
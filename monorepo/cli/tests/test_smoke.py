@@ -6,9 +6,29 @@ SHARED = ROOT / "shared"
 if str(SHARED) not in sys.path:
 	sys.path.insert(0, str(SHARED))
 
+from langextract.core import _chunk_text  # type: ignore
 from langextract.schemas import ensure_extraction_shape  # type: ignore
 
 
 def test_ensure_extraction_shape_handles_invalid():
 	assert ensure_extraction_shape({}) == {"entities": [], "relationships": []}
 	assert ensure_extraction_shape({"entities": [{"name": "X", "type": "PERSON"}]})["entities"][0]["name"] == "X"
+
+
+def test_ensure_extraction_shape_coerces_field_types():
+	data = ensure_extraction_shape({
+		"entities": [{"id": 1, "name": "X", "type": "PERSON", "start_index": "3", "end_index": "n/a", "attributes": ["bad"]}],
+		"relationships": [{"id": 2, "source_entity_id": "a", "target_entity_id": "b", "type": "R", "attributes": None}],
+	})
+	entity = data["entities"][0]
+	assert (entity["id"], entity["start_index"], entity["end_index"], entity["attributes"]) == ("1", 3, None, {})
+	assert data["relationships"][0]["id"] == "2"
+	assert data["relationships"][0]["attributes"] == {}
+
+
+def test_chunk_text_overlaps_and_stops_at_end():
+	assert _chunk_text("abcdefghij", 6, 2, 8) == ["abcdef", "efghij"]
+	assert _chunk_text("abcdefghij", 4, 1, 8) == ["abcd", "defg", "ghij"]
+	assert _chunk_text("abcdefghij", 4, 1, 2) == ["abcd", "defg"]
+	assert _chunk_text("abc", 6, 2, 8) == ["abc"]
+	assert _chunk_text("", 6, 2, 8) == []
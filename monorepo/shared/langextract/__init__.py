@@ -1,3 +1,3 @@
-from .core import run_extraction, run_multi_model_analysis
-from .html import generate_html_report
+from .core import run_extraction, iter_extraction, run_multi_model_analysis, analyze_with_model, referee_analysis
+from .html import generate_html_report, iter_html_report
 from .schemas import list_schemas
@@ -0,0 +1,64 @@
+import hashlib
+import logging
+import os
+import tempfile
+from functools import lru_cache
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+def response_key(*parts: object) -> str:
+	"""sha256 over the parts; each is length-prefixed so adjacent values can't run together."""
+	h = hashlib.sha256()
+	for part in parts:
+		data = str(part).encode("utf-8")
+		h.update(len(data).to_bytes(8, "big"))
+		h.update(data)
+	return h.hexdigest()
+
+
+class ResponseCache:
+	"""Raw model responses stored as one file per key under cache_dir."""
+
+	def __init__(self, cache_dir: str) -> None:
+		self.cache_dir = cache_dir
+		os.makedirs(cache_dir, exist_ok=True)
+
+	def _path(self, key: str) -> str:
+		return os.path.join(self.cache_dir, f"{key}.json")
+
+	def get(self, key: str) -> Optional[str]:
+		try:
+			with open(self._path(key), "r", encoding="utf-8") as f:
+				return f.read()
+		except OSError:
+			return None
+
+	def set(self, key: str, content: str) -> None:
+		"""Store content atomically; a failed write is logged, never raised, since the cache is optional."""
+		# A unique temp file per writer, so concurrent writes of one key can't replace each other's file
+		tmp = None
+		try:
+			fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+			with os.fdopen(fd, "w", encoding="utf-8") as f:
+				f.write(content)
+			os.replace(tmp, self._path(key))
+		except OSError as e:
+			logger.warning("Response cache write failed for %s: %s", key, e)
+			if tmp is not None:
+				try:
+					os.remove(tmp)
+				except OSError:
+					pass
+
+	def evict(self, key: str) -> None:
+		try:
+			os.remove(self._path(key))
+		except OSError:
+			pass
+
+
+@lru_cache(maxsize=None)
+def get_response_cache(cache_dir: str) -> ResponseCache:
+	return ResponseCache(cache_dir)
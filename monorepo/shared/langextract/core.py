@@ -1,15 +1,57 @@
 import json
+import logging
 import os
 import re
-from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+# orjson decodes model output several times faster; the stdlib is the fallback
+try:
+	from orjson import loads as _json_loads
+except Exception:  # pragma: no cover
+	_json_loads = json.loads
+
+# msgspec decodes straight into the two fields ensure_extraction_shape reads, skipping the rest of the payload
+try:
+	import msgspec
+except Exception:  # pragma: no cover
+	msgspec = None
+
+_RAW_DECODER = None
+if msgspec is not None:
+	class _RawExtraction(msgspec.Struct):
+		# UNSET fields are left out by to_builtins, so an empty object still decodes to {}
+		entities: Union[list, msgspec.UnsetType] = msgspec.UNSET
+		relationships: Union[list, msgspec.UnsetType] = msgspec.UNSET
+
+	_RAW_DECODER = msgspec.json.Decoder(_RawExtraction)
 
 from .prompts import build_system_prompt, build_user_prompt, build_referee_prompt
-from .schemas import ensure_extraction_shape
-from .ollama_backend import chat_json
+from .schemas import EntityDict, ExtractionResult, RelationshipDict, ensure_extraction_shape
+from .ollama_backend import _DEFAULT_NUM_CTX, chat_json
+from .cache import get_response_cache, response_key
+
+
+logger = logging.getLogger(__name__)
+
+# Read once at import, like ollama_backend's settings; per-call arguments still override them
+_DEFAULT_MODEL = os.getenv("OLLAMA_MODEL", "gemma3:4b")
+_CACHE_DIR = os.getenv("LANGEXTRACT_CACHE_DIR")
+_MAX_INPUT_CHARS = int(os.getenv("MAX_INPUT_CHARS", "12000"))
+_CHUNK_OVERLAP_CHARS = int(os.getenv("CHUNK_OVERLAP_CHARS", "200"))
+_MAX_CHUNKS = int(os.getenv("MAX_CHUNKS", "8"))
+# Chunks are independent requests; keep this at or below the server's OLLAMA_NUM_PARALLEL
+_CHUNK_CONCURRENCY = int(os.getenv("CHUNK_CONCURRENCY", "4"))
+_CHUNK_BATCH_SIZE = int(os.getenv("CHUNK_BATCH_SIZE", "1"))
+
+
+# From the first "{" to a "}" that ends the (right-stripped) text
+_JSON_BLOCK_RE = re.compile(r"\{[\s\S]*\}\s*\Z")
 
 
 def _extract_first_json_block(text: str) -> str:
-	match = re.search(r"\{[\s\S]*\}\s*$", text.strip())
+	# Leading whitespace can't change where the match starts, so only the right side is stripped
+	match = _JSON_BLOCK_RE.search(text.rstrip())
 	if match:
 		return match.group(0)
 	# Fallback: try to find the first and last curly brace
@@ -21,17 +63,93 @@ def _extract_first_json_block(text: str) -> str:
 
 
 def _to_json(content: str) -> Dict[str, Any]:
+	if _RAW_DECODER is not None:
+		try:
+			return msgspec.to_builtins(_RAW_DECODER.decode(content))
+		except msgspec.MsgspecError:
+			# not plain JSON or not the expected shape; the paths below handle it as before
+			pass
 	try:
-		return json.loads(content)
+		return _json_loads(content)
 	except json.JSONDecodeError:
 		block = _extract_first_json_block(content)
 		try:
-			return json.loads(block)
+			return _json_loads(block)
 		except Exception:
 			return {}
 
 
-def run_extraction(
+def _chat_extraction(
+	*,
+	system_prompt: str,
+	user_prompt: str,
+	model: str,
+	temperature: float,
+	max_output_tokens: int,
+	request_timeout_seconds: Optional[int],
+	num_ctx: Optional[int],
+	cache_dir: Optional[str] = None,
+) -> ExtractionResult:
+	"""chat_json parsed into extraction shape, served from the response cache when one is configured.
+
+	Only deterministic (temperature 0) calls are cached; cache_dir defaults to LANGEXTRACT_CACHE_DIR.
+	"""
+	cache_dir = cache_dir or _CACHE_DIR
+	cache = get_response_cache(cache_dir) if cache_dir and temperature <= 0 else None
+	key = ""
+	if cache is not None:
+		effective_num_ctx = num_ctx if num_ctx is not None else _DEFAULT_NUM_CTX
+		# Exact prompts: start_index/end_index point into the text, so any rewrite of it needs its own entry
+		key = response_key(model, system_prompt, user_prompt, temperature, max_output_tokens, effective_num_ctx)
+		cached = cache.get(key)
+		if cached is not None:
+			data = _to_json(cached)
+			if data:
+				return ensure_extraction_shape(data)
+			# unparseable entry (e.g. edited by hand); drop it and ask the model again
+			cache.evict(key)
+
+	content = chat_json(
+		system_prompt=system_prompt,
+		user_prompt=user_prompt,
+		model=model,
+		temperature=temperature,
+		max_output_tokens=max_output_tokens,
+		request_timeout_seconds=request_timeout_seconds,
+		num_ctx=num_ctx,
+	)
+	data = _to_json(content)
+	if cache is not None and data:
+		cache.set(key, content)
+	return ensure_extraction_shape(data)
+
+
+def _entity_key(e: EntityDict) -> Tuple[str, str]:
+	return (str(e.get("name", "")).strip().lower(), str(e.get("type", "")).strip().lower())
+
+
+def _rel_key(r: RelationshipDict) -> Tuple[str, str, str]:
+	return (
+		str(r.get("source_entity_id", "")),
+		str(r.get("target_entity_id", "")),
+		str(r.get("type", "")),
+	)
+
+
+def _chunk_text(text: str, size: int, overlap: int, limit: int) -> List[str]:
+	"""Split text into at most limit chunks of size chars, each overlapping the previous by overlap chars.
+
+	Stops at the first chunk that reaches the end of the text.
+	"""
+	n = len(text)
+	if not n or limit <= 0:
+		return []
+	step = max(size - overlap, 1)
+	count = 1 if n <= size else 1 + -(-(n - size) // step)
+	return [text[start:start + size] for start in range(0, min(count, limit) * step, step)]
+
+
+def _plan_extraction(
 	*,
 	text: str,
 	language: str = "fa",
@@ -46,13 +164,17 @@ def run_extraction(
 	max_input_chars: Optional[int] = None,
 	chunk_overlap_chars: Optional[int] = None,
 	max_chunks: Optional[int] = None,
-) -> Dict[str, Any]:
-	model_name = model or os.getenv("OLLAMA_MODEL", "gemma3:4b")
+	chunk_concurrency: Optional[int] = None,
+	chunk_batch_size: Optional[int] = None,
+	cache_dir: Optional[str] = None,
+) -> Tuple[Callable[[str], ExtractionResult], Optional[List[str]], int]:
+	"""Resolve settings for an extraction: (model call for one piece of text, chunks or None if the text fits, worker count)."""
+	model_name = model or _DEFAULT_MODEL
 
-	def _call_model(src_text: str) -> Dict[str, Any]:
+	def _call_model(src_text: str) -> ExtractionResult:
 		system_prompt = build_system_prompt(language=language, schema_name=schema, domain=domain)
 		user_prompt = build_user_prompt(text=src_text, language=language, examples=examples or [], domain=domain)
-		content = chat_json(
+		return _chat_extraction(
 			system_prompt=system_prompt,
 			user_prompt=user_prompt,
 			model=model_name,
@@ -60,152 +182,206 @@ def run_extraction(
 			max_output_tokens=max_output_tokens,
 			request_timeout_seconds=request_timeout_seconds,
 			num_ctx=num_ctx,
+			cache_dir=cache_dir,
 		)
-		return ensure_extraction_shape(_to_json(content))
 
 	# Resolve chunking parameters
-	max_in = int(max_input_chars) if max_input_chars is not None else int(os.getenv("MAX_INPUT_CHARS", "12000"))
-	overlap = int(chunk_overlap_chars) if chunk_overlap_chars is not None else int(os.getenv("CHUNK_OVERLAP_CHARS", "200"))
-	max_parts = int(max_chunks) if max_chunks is not None else int(os.getenv("MAX_CHUNKS", "8"))
+	max_in = int(max_input_chars) if max_input_chars is not None else _MAX_INPUT_CHARS
+	overlap = int(chunk_overlap_chars) if chunk_overlap_chars is not None else _CHUNK_OVERLAP_CHARS
+	max_parts = int(max_chunks) if max_chunks is not None else _MAX_CHUNKS
+	workers = int(chunk_concurrency) if chunk_concurrency is not None else _CHUNK_CONCURRENCY
+	batch = int(chunk_batch_size) if chunk_batch_size is not None else _CHUNK_BATCH_SIZE
+	if batch > 1:
+		# Send runs of `batch` consecutive chunks as one call when the context window has room
+		# (~3 chars per token); covers the same span of text with fewer, larger requests
+		ctx_tokens = int(num_ctx) if num_ctx is not None else _DEFAULT_NUM_CTX
+		batch = max(1, min(batch, (ctx_tokens * 3) // max_in, max_parts))
+		max_in = batch * max_in - (batch - 1) * overlap
+		max_parts = -(-max_parts // batch)
 
 	if len(text) <= max_in:
-		return _call_model(text)
+		return _call_model, None, workers
 
 	# Chunk long input by character length with an overlap for context preservation
-	def _chunk_text(t: str, size: int, ov: int, limit: int) -> List[str]:
-		chunks: List[str] = []
-		start = 0
-		while start < len(t) and len(chunks) < limit:
-			end = min(start + size, len(t))
-			chunks.append(t[start:end])
-			if end == len(t):
-				break
-			start = max(end - ov, start + 1)
-		return chunks
-
 	parts = _chunk_text(text, max_in, overlap, max_parts)
-	all_entities: List[Dict[str, Any]] = []
-	all_relationships: List[Dict[str, Any]] = []
-
-	# Dedup helpers
-	def _entity_key(e: Dict[str, Any]) -> Tuple[str, str]:
-		return (str(e.get("name", "")).strip().lower(), str(e.get("type", "")).strip().lower())
-
-	def _rel_key(r: Dict[str, Any]) -> Tuple[str, str, str]:
-		return (
-			str(r.get("source_entity_id", "")),
-			str(r.get("target_entity_id", "")),
-			str(r.get("type", "")),
-		)
+	return _call_model, parts, max(1, min(workers, len(parts)))
 
-	seen_entities: set = set()
-	seen_rels: set = set()
 
-	for p in parts:
-		res = _call_model(p)
+def run_extraction(
+	*,
+	text: str,
+	language: str = "fa",
+	schema: str = "general",
+	domain: str = "general",
+	examples: Optional[List[Dict[str, Any]]] = None,
+	model: Optional[str] = None,
+	temperature: float = 0.0,
+	max_output_tokens: int = 1024,
+	request_timeout_seconds: Optional[int] = None,
+	num_ctx: Optional[int] = None,
+	max_input_chars: Optional[int] = None,
+	chunk_overlap_chars: Optional[int] = None,
+	max_chunks: Optional[int] = None,
+	chunk_concurrency: Optional[int] = None,
+	chunk_batch_size: Optional[int] = None,
+	cache_dir: Optional[str] = None,
+) -> ExtractionResult:
+	call_model, parts, workers = _plan_extraction(
+		text=text, language=language, schema=schema, domain=domain, examples=examples, model=model,
+		temperature=temperature, max_output_tokens=max_output_tokens, request_timeout_seconds=request_timeout_seconds,
+		num_ctx=num_ctx, max_input_chars=max_input_chars, chunk_overlap_chars=chunk_overlap_chars, max_chunks=max_chunks,
+		chunk_concurrency=chunk_concurrency, chunk_batch_size=chunk_batch_size, cache_dir=cache_dir,
+	)
+	if parts is None:
+		return call_model(text)
+
+	# Call the model for all chunks concurrently; map keeps chunk order so dedup keeps the first occurrence
+	with ThreadPoolExecutor(max_workers=workers) as executor:
+		results = list(executor.map(call_model, parts))
+
+	# Dedup across chunks; dicts keep insertion order, so the first occurrence wins
+	entities_by_key: Dict[Tuple[str, str], EntityDict] = {}
+	rels_by_key: Dict[Tuple[str, str, str], RelationshipDict] = {}
+	for res in results:
 		for e in res.get("entities", []):
-			k = _entity_key(e)
-			if k not in seen_entities:
-				seen_entities.add(k)
-				all_entities.append(e)
+			entities_by_key.setdefault(_entity_key(e), e)
 		for r in res.get("relationships", []):
-			k2 = _rel_key(r)
-			if k2 not in seen_rels:
-				seen_rels.add(k2)
-				all_relationships.append(r)
+			rels_by_key.setdefault(_rel_key(r), r)
 
-	return {"entities": all_entities, "relationships": all_relationships}
+	return {"entities": list(entities_by_key.values()), "relationships": list(rels_by_key.values())}
 
 
-def run_multi_model_analysis(
+def iter_extraction(
 	*,
 	text: str,
 	language: str = "fa",
+	schema: str = "general",
 	domain: str = "general",
-	model_first: str,
-	model_second: str,
-	model_referee: str,
+	examples: Optional[List[Dict[str, Any]]] = None,
+	model: Optional[str] = None,
 	temperature: float = 0.0,
 	max_output_tokens: int = 1024,
 	request_timeout_seconds: Optional[int] = None,
 	num_ctx: Optional[int] = None,
-) -> Dict[str, Any]:
-	"""
-	Run multi-model analysis with two models + referee
+	max_input_chars: Optional[int] = None,
+	chunk_overlap_chars: Optional[int] = None,
+	max_chunks: Optional[int] = None,
+	chunk_concurrency: Optional[int] = None,
+	chunk_batch_size: Optional[int] = None,
+	cache_dir: Optional[str] = None,
+) -> Iterator[ExtractionResult]:
+	"""Like run_extraction, but yields the not-yet-seen entities and relationships of each chunk as soon as it finishes.
+
+	Chunks complete in any order, so which duplicate is kept may differ from run_extraction.
 	"""
+	call_model, parts, workers = _plan_extraction(
+		text=text, language=language, schema=schema, domain=domain, examples=examples, model=model,
+		temperature=temperature, max_output_tokens=max_output_tokens, request_timeout_seconds=request_timeout_seconds,
+		num_ctx=num_ctx, max_input_chars=max_input_chars, chunk_overlap_chars=chunk_overlap_chars, max_chunks=max_chunks,
+		chunk_concurrency=chunk_concurrency, chunk_batch_size=chunk_batch_size, cache_dir=cache_dir,
+	)
+	if parts is None:
+		yield call_model(text)
+		return
+
+	seen_entities: set = set()
+	seen_rels: set = set()
+	with ThreadPoolExecutor(max_workers=workers) as executor:
+		futures = [executor.submit(call_model, p) for p in parts]
+		try:
+			for future in as_completed(futures):
+				res = future.result()
+				delta: ExtractionResult = {"entities": [], "relationships": []}
+				for e in res.get("entities", []):
+					k = _entity_key(e)
+					if k not in seen_entities:
+						seen_entities.add(k)
+						delta["entities"].append(e)
+				for r in res.get("relationships", []):
+					k2 = _rel_key(r)
+					if k2 not in seen_rels:
+						seen_rels.add(k2)
+						delta["relationships"].append(r)
+				yield delta
+		finally:
+			# consumer stopped early (e.g. client disconnected): don't start the remaining chunks
+			for future in futures:
+				future.cancel()
+
+
+def analyze_with_model(
+	*,
+	text: str,
+	model: str,
+	language: str = "fa",
+	domain: str = "general",
+	temperature: float = 0.0,
+	max_output_tokens: int = 1024,
+	request_timeout_seconds: Optional[int] = None,
+	num_ctx: Optional[int] = None,
+) -> ExtractionResult:
+	"""Single-model pass of the multi-model analysis (no chunking, no few-shot examples)."""
+	system_prompt = build_system_prompt(language=language, schema_name="general", domain=domain)
+	user_prompt = build_user_prompt(text=text, language=language, examples=[], domain=domain)
+	return _chat_extraction(
+		system_prompt=system_prompt,
+		user_prompt=user_prompt,
+		model=model,
+		temperature=temperature,
+		max_output_tokens=max_output_tokens,
+		request_timeout_seconds=request_timeout_seconds,
+		num_ctx=num_ctx,
+	)
+
+
+def _compare_analyses(analysis1: ExtractionResult, analysis2: ExtractionResult) -> Tuple[float, List[str], List[str]]:
+	"""Agreement score plus conflicting entities and relationships, from one set of keys per analysis"""
+	# Key each entity once; the sets and the conflict lists below all reuse these keys
+	keyed1 = [((e.get("name", "").lower(), e.get("type", "").lower()), e) for e in analysis1.get("entities", [])]
+	keyed2 = [((e.get("name", "").lower(), e.get("type", "").lower()), e) for e in analysis2.get("entities", [])]
+	entities1 = {k for k, _ in keyed1}
+	entities2 = {k for k, _ in keyed2}
 	
-	def _analyze_with_model(model_name: str, src_text: str) -> Dict[str, Any]:
-		"""Run single model analysis"""
-		system_prompt = build_system_prompt(language=language, schema_name="general", domain=domain)
-		user_prompt = build_user_prompt(text=src_text, language=language, examples=[], domain=domain)
-		content = chat_json(
-			system_prompt=system_prompt,
-			user_prompt=user_prompt,
-			model=model_name,
-			temperature=temperature,
-			max_output_tokens=max_output_tokens,
-			request_timeout_seconds=request_timeout_seconds,
-			num_ctx=num_ctx,
-		)
-		return ensure_extraction_shape(_to_json(content))
-	
-	def _calculate_agreement_score(analysis1: Dict[str, Any], analysis2: Dict[str, Any]) -> float:
-		"""Calculate agreement score between two analyses"""
-		entities1 = set((e.get("name", "").lower(), e.get("type", "").lower()) for e in analysis1.get("entities", []))
-		entities2 = set((e.get("name", "").lower(), e.get("type", "").lower()) for e in analysis2.get("entities", []))
-		
-		if not entities1 and not entities2:
-			return 1.0
-		if not entities1 or not entities2:
-			return 0.0
-			
-		intersection = len(entities1.intersection(entities2))
-		union = len(entities1.union(entities2))
-		return intersection / union if union > 0 else 0.0
-	
-	def _find_conflicts(analysis1: Dict[str, Any], analysis2: Dict[str, Any]) -> Tuple[List[str], List[str]]:
-		"""Find conflicting entities and relationships"""
-		entities1 = {(e.get("name", "").lower(), e.get("type", "").lower()) for e in analysis1.get("entities", [])}
-		entities2 = {(e.get("name", "").lower(), e.get("type", "").lower()) for e in analysis2.get("entities", [])}
-		
-		conflicting_entities = []
-		for e1 in analysis1.get("entities", []):
-			name_type = (e1.get("name", "").lower(), e1.get("type", "").lower())
-			if name_type not in entities2:
-				conflicting_entities.append(f"{e1.get('name')} ({e1.get('type')})")
-		
-		for e2 in analysis2.get("entities", []):
-			name_type = (e2.get("name", "").lower(), e2.get("type", "").lower())
-			if name_type not in entities1:
-				conflicting_entities.append(f"{e2.get('name')} ({e2.get('type')})")
-		
-		# Simple relationship conflict detection
-		rels1 = {(r.get("source_entity_id", ""), r.get("target_entity_id", ""), r.get("type", "")) for r in analysis1.get("relationships", [])}
-		rels2 = {(r.get("source_entity_id", ""), r.get("target_entity_id", ""), r.get("type", "")) for r in analysis2.get("relationships", [])}
-		
-		conflicting_relationships = []
-		all_rels = rels1.union(rels2)
-		for rel in all_rels:
-			if rel in rels1 and rel not in rels2:
-				conflicting_relationships.append(f"{rel[0]} -> {rel[1]} ({rel[2]})")
-			elif rel in rels2 and rel not in rels1:
-				conflicting_relationships.append(f"{rel[0]} -> {rel[1]} ({rel[2]})")
-		
-		return conflicting_entities, conflicting_relationships
+	# Jaccard similarity of (name, type) pairs
+	if not entities1 and not entities2:
+		agreement_score = 1.0
+	elif not entities1 or not entities2:
+		agreement_score = 0.0
+	else:
+		agreement_score = len(entities1 & entities2) / len(entities1 | entities2)
 	
-	# Step 1: Run first two models
-	print(f"Running first model analysis: {model_first}")
-	first_analysis = _analyze_with_model(model_first, text)
+	conflicting_entities = [f"{e.get('name')} ({e.get('type')})" for k, e in keyed1 if k not in entities2]
+	conflicting_entities.extend(f"{e.get('name')} ({e.get('type')})" for k, e in keyed2 if k not in entities1)
 	
-	print(f"Running second model analysis: {model_second}")
-	second_analysis = _analyze_with_model(model_second, text)
+	# Simple relationship conflict detection: relationships found by only one model
+	rels1 = {(r.get("source_entity_id", ""), r.get("target_entity_id", ""), r.get("type", "")) for r in analysis1.get("relationships", [])}
+	rels2 = {(r.get("source_entity_id", ""), r.get("target_entity_id", ""), r.get("type", "")) for r in analysis2.get("relationships", [])}
+	conflicting_relationships = [f"{rel[0]} -> {rel[1]} ({rel[2]})" for rel in rels1 ^ rels2]
 	
-	# Step 2: Calculate agreement and conflicts
-	agreement_score = _calculate_agreement_score(first_analysis, second_analysis)
-	conflicting_entities, conflicting_relationships = _find_conflicts(first_analysis, second_analysis)
+	return agreement_score, conflicting_entities, conflicting_relationships
+
+
+def referee_analysis(
+	*,
+	text: str,
+	first_analysis: ExtractionResult,
+	second_analysis: ExtractionResult,
+	model_first: str,
+	model_second: str,
+	model_referee: str,
+	language: str = "fa",
+	domain: str = "general",
+	temperature: float = 0.0,
+	max_output_tokens: int = 1024,
+	request_timeout_seconds: Optional[int] = None,
+	num_ctx: Optional[int] = None,
+) -> Dict[str, Any]:
+	"""Compare the two single-model analyses, run the referee model and assemble the full result."""
+	# Calculate agreement and conflicts
+	agreement_score, conflicting_entities, conflicting_relationships = _compare_analyses(first_analysis, second_analysis)
 	
-	# Step 3: Run referee model
-	print(f"Running referee model: {model_referee}")
+	# Run referee model
+	logger.info("Running referee model: %s", model_referee)
 	referee_prompt = build_referee_prompt(
 		text=text,
 		language=language,
@@ -214,7 +390,7 @@ def run_multi_model_analysis(
 		domain=domain
 	)
 	
-	referee_content = chat_json(
+	final_analysis = _chat_extraction(
 		system_prompt=build_system_prompt(language=language, schema_name="general", domain=domain),
 		user_prompt=referee_prompt,
 		model=model_referee,
@@ -223,7 +399,6 @@ def run_multi_model_analysis(
 		request_timeout_seconds=request_timeout_seconds,
 		num_ctx=num_ctx,
 	)
-	final_analysis = ensure_extraction_shape(_to_json(referee_content))
 	
 	return {
 		"text": text,
@@ -248,3 +423,49 @@ def run_multi_model_analysis(
 		"conflicting_entities": conflicting_entities,
 		"conflicting_relationships": conflicting_relationships,
 	}
+
+
+def run_multi_model_analysis(
+	*,
+	text: str,
+	language: str = "fa",
+	domain: str = "general",
+	model_first: str,
+	model_second: str,
+	model_referee: str,
+	temperature: float = 0.0,
+	max_output_tokens: int = 1024,
+	request_timeout_seconds: Optional[int] = None,
+	num_ctx: Optional[int] = None,
+) -> Dict[str, Any]:
+	"""
+	Run multi-model analysis with two models + referee
+	"""
+	common = dict(
+		text=text,
+		language=language,
+		domain=domain,
+		temperature=temperature,
+		max_output_tokens=max_output_tokens,
+		request_timeout_seconds=request_timeout_seconds,
+		num_ctx=num_ctx,
+	)
+	
+	# Step 1: Run first two models concurrently (they are independent of each other)
+	logger.info("Running first model analysis: %s", model_first)
+	logger.info("Running second model analysis: %s", model_second)
+	with ThreadPoolExecutor(max_workers=2) as executor:
+		first_future = executor.submit(analyze_with_model, model=model_first, **common)
+		second_future = executor.submit(analyze_with_model, model=model_second, **common)
+		first_analysis = first_future.result()
+		second_analysis = second_future.result()
+	
+	# Step 2: Agreement, conflicts and referee
+	return referee_analysis(
+		first_analysis=first_analysis,
+		second_analysis=second_analysis,
+		model_first=model_first,
+		model_second=model_second,
+		model_referee=model_referee,
+		**common,
+	)
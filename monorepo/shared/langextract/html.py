@@ -1,40 +1,42 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List
 import html as html_lib
+import re
 
 
 def _highlight_text(text: str, entities: List[Dict[str, Any]]) -> str:
-	marked = text
-	# naive highlight: replace first occurrence of entity name with span
+	"""Mark the first occurrence of each entity name in (already escaped) text, in a single regex pass
+	that stops once every name has been marked."""
+	types: Dict[str, str] = {}
 	for e in entities:
 		name = e.get("name")
-		type_ = e.get("type", "ENTITY")
-		if not name:
-			continue
-		escaped = html_lib.escape(str(name))
-		span = f'<mark class="entity" title="{html_lib.escape(type_)}">{escaped}</mark>'
-		if escaped in marked:
-			marked = marked.replace(escaped, span, 1)
-	return marked
-
-
-def generate_html_report(*, source_text: str, extraction: Dict[str, Any], language: str, model: str) -> str:
-	entities = extraction.get("entities", [])
-	relationships = extraction.get("relationships", [])
-	body_text = _highlight_text(html_lib.escape(source_text), entities)
+		if name:
+			types.setdefault(html_lib.escape(str(name)), e.get("type", "ENTITY"))
+	if not types:
+		return text
 
-	entities_rows = "\n".join(
-		f"<tr><td>{html_lib.escape(e.get('name',''))}</td><td>{html_lib.escape(e.get('type',''))}</td><td><pre>{html_lib.escape(str(e.get('attributes',{})))}</pre></td></tr>"
-		for e in entities
-	)
+	# Longest names first so "Ali Rezaei" wins over "Ali" at the same position
+	pattern = re.compile("|".join(re.escape(n) for n in sorted(types, key=len, reverse=True)))
+	done = set()
+	pieces: List[str] = []
+	pos = 0
+	for m in pattern.finditer(text):
+		escaped = m.group(0)
+		if escaped in done:
+			continue
+		done.add(escaped)
+		pieces.append(text[pos:m.start()])
+		pieces.append(f'<mark class="entity" title="{html_lib.escape(types[escaped])}">{escaped}</mark>')
+		pos = m.end()
+		# Every name is marked; the rest of the text is copied without scanning it
+		if len(done) == len(types):
+			break
+	pieces.append(text[pos:])
+	return "".join(pieces)
 
-	rel_rows = "\n".join(
-		f"<tr><td>{html_lib.escape(r.get('source_entity_id',''))}</td><td>{html_lib.escape(r.get('type',''))}</td><td>{html_lib.escape(r.get('target_entity_id',''))}</td><td><pre>{html_lib.escape(str(r.get('attributes',{})))}</pre></td></tr>"
-		for r in relationships
-	)
 
-	html = f"""
+_REPORT_HEAD = """
 <!doctype html>
-<html lang=\"{html_lib.escape(language)}\">
+<html lang=\"{language}\">
 <head>
 <meta charset=\"utf-8\" />
 <title>LangExtract Report</title>
@@ -50,24 +52,56 @@ small {{ color: #666; }}
 </head>
 <body>
 <h1>Extraction Report</h1>
-<small>Model: {html_lib.escape(model)}</small>
+<small>Model: {model}</small>
 <h2>Source Text</h2>
-<p>{body_text}</p>
+<p>"""
+
+_ENTITIES_HEAD = """</p>
 <h2>Entities</h2>
 <table>
   <thead><tr><th>Name</th><th>Type</th><th>Attributes</th></tr></thead>
   <tbody>
-  {entities_rows}
+  """
+
+_RELATIONSHIPS_HEAD = """
   </tbody>
 </table>
 <h2>Relationships</h2>
 <table>
   <thead><tr><th>Source</th><th>Type</th><th>Target</th><th>Attributes</th></tr></thead>
   <tbody>
-  {rel_rows}
+  """
+
+_REPORT_TAIL = """
   </tbody>
 </table>
 </body>
 </html>
 """
-	return html
+
+
+def iter_html_report(*, source_text: str, extraction: Dict[str, Any], language: str, model: str) -> Iterator[str]:
+	"""Yield the report in pieces (header, one table row at a time, footer) for streaming responses."""
+	entities = extraction.get("entities", [])
+	relationships = extraction.get("relationships", [])
+
+	yield _REPORT_HEAD.format(language=html_lib.escape(language), model=html_lib.escape(model))
+	yield _highlight_text(html_lib.escape(source_text), entities)
+
+	yield _ENTITIES_HEAD
+	sep = ""
+	for e in entities:
+		yield f"{sep}<tr><td>{html_lib.escape(e.get('name',''))}</td><td>{html_lib.escape(e.get('type',''))}</td><td><pre>{html_lib.escape(str(e.get('attributes',{})))}</pre></td></tr>"
+		sep = "\n"
+
+	yield _RELATIONSHIPS_HEAD
+	sep = ""
+	for r in relationships:
+		yield f"{sep}<tr><td>{html_lib.escape(r.get('source_entity_id',''))}</td><td>{html_lib.escape(r.get('type',''))}</td><td>{html_lib.escape(r.get('target_entity_id',''))}</td><td><pre>{html_lib.escape(str(r.get('attributes',{})))}</pre></td></tr>"
+		sep = "\n"
+
+	yield _REPORT_TAIL
+
+
+def generate_html_report(*, source_text: str, extraction: Dict[str, Any], language: str, model: str) -> str:
+	return "".join(iter_html_report(source_text=source_text, extraction=extraction, language=language, model=model))
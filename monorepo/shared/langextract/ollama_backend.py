@@ -1,13 +1,90 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import logging
 import os
-from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+import re
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 try:
+	import httpx
 	from ollama import Client
 except Exception:  # pragma: no cover
 	Client = None  # type: ignore
 
 
+logger = logging.getLogger(__name__)
+
+# Read once at import, like the backend's config module; per-call arguments still override them
+_DEFAULT_HOST = os.getenv("OLLAMA_HOST", "http://127.0.0.1:11434")
+_DEFAULT_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT_SECONDS", "120"))
+_DEFAULT_NUM_CTX = int(os.getenv("NUM_CTX", os.getenv("CONTEXT_WINDOW", "4096")))
+# Keep the model (and its prompt KV cache) loaded between calls; Ollama's own default is 5m
+_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+# One pooled client per Ollama host and timeout so keep-alive connections are reused across calls
+_CLIENTS: Dict[Tuple[str, int], Any] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def _get_client(host: str, timeout: int) -> Any:
+	"""Return the shared Client for host and timeout, creating it on first use."""
+	key = (host, timeout)
+	client = _CLIENTS.get(key)
+	if client is None:
+		with _CLIENTS_LOCK:
+			client = _CLIENTS.get(key)
+			if client is None:
+				client = Client(
+					host=host,
+					timeout=timeout,
+					limits=httpx.Limits(max_keepalive_connections=40, max_connections=100, keepalive_expiry=30),
+				)
+				_CLIENTS[key] = client
+	return client
+
+
+def close_clients() -> None:
+	"""Close all pooled Ollama clients (call on application shutdown)."""
+	with _CLIENTS_LOCK:
+		for client in _CLIENTS.values():
+			# ollama.Client does not expose close(); release its httpx pool directly
+			client._client.close()
+		_CLIENTS.clear()
+
+
+def _chat(*, host: str, timeout: int, model: str, messages: List[Dict[str, str]], options: Dict[str, Any]) -> Dict[str, Any]:
+	"""One non-streaming chat call; Ollama answers only once it is done, so the httpx timeout bounds the whole call."""
+	client = _get_client(host, timeout)
+	try:
+		return client.chat(
+			model=model,
+			messages=messages,
+			options=options,
+			keep_alive=_KEEP_ALIVE,
+		)
+	except httpx.TimeoutException:
+		raise RuntimeError(f"Ollama chat timed out after {timeout}s")
+
+
+def trim_history(history: List[Dict[str, str]], *, min_window: int = 20, reset_at: int = 40) -> List[Dict[str, str]]:
+	"""Bound a conversation history without shifting it on every turn.
+
+	A fixed sliding window drops the oldest message each turn, so the prompt prefix
+	changes and Ollama's prompt cache never hits. Here the history is kept whole up
+	to reset_at messages; after that the start of the window only moves forward in
+	steps of (reset_at - min_window), keeping at least min_window messages, so
+	between those resets each turn only appends. The cut depends only on
+	len(history), so no per-session state is needed.
+	Pass the full history every turn; reset_at <= min_window disables trimming.
+	"""
+	step = reset_at - min_window
+	if step <= 0 or len(history) <= reset_at:
+		return history
+	start = (len(history) - min_window) // step * step
+	return history[start:]
+
+
 def chat_json(
 	*,
 	system_prompt: str,
@@ -22,10 +99,9 @@ def chat_json(
 
 	The prompt instructs the model to output compact JSON only.
 	"""
-	host = os.getenv("OLLAMA_HOST", "http://127.0.0.1:11434")
+	host = _DEFAULT_HOST
 	if Client is None:
 		raise RuntimeError("ollama Python package is not installed")
-	client = Client(host=host)
 
 	messages: List[Dict[str, str]] = [
 		{"role": "system", "content": system_prompt},
@@ -33,46 +109,92 @@ def chat_json(
 	]
 
  
-	effective_timeout = (
-		int(request_timeout_seconds)
-		if request_timeout_seconds is not None
-		else int(os.getenv("REQUEST_TIMEOUT_SECONDS", "120"))
-	)
-	effective_num_ctx = (
-		int(num_ctx)
-		if num_ctx is not None
-		else int(os.getenv("NUM_CTX", os.getenv("CONTEXT_WINDOW", "4096")))
+	effective_timeout = int(request_timeout_seconds) if request_timeout_seconds is not None else _DEFAULT_TIMEOUT
+	effective_num_ctx = int(num_ctx) if num_ctx is not None else _DEFAULT_NUM_CTX
+
+	resp = _chat(
+		host=host,
+		timeout=effective_timeout,
+		model=model,
+		messages=messages,
+		options={
+			"temperature": temperature,
+			"num_predict": max_output_tokens,
+			"num_ctx": effective_num_ctx,
+		},
 	)
 
-	def _do_chat() -> Dict[str, Any]:
-		# Adjust context window based on message count
-		adjusted_num_ctx = effective_num_ctx
-		if len(messages) > 15:
-			# Increase context window for long conversations
-			adjusted_num_ctx = min(effective_num_ctx * 2, 8192)  # Cap at 8K
-			print(f"📝 Adjusted context window to {adjusted_num_ctx} for long conversation")
-		
-		return client.chat(
+	message = resp.get("message") or {}
+	content: str = message.get("content", "{}")
+	return content
+
+
+def chat_json_stream(
+	*,
+	system_prompt: str,
+	user_prompt: str,
+	model: str,
+	temperature: float = 0.0,
+	max_output_tokens: int = 1024,
+	request_timeout_seconds: Optional[int] = None,
+	num_ctx: Optional[int] = None,
+) -> Iterator[str]:
+	"""Like chat_json, but yields the content piece by piece as Ollama generates it.
+
+	The timeout applies to the wait for each piece rather than to the whole response.
+	"""
+	if Client is None:
+		raise RuntimeError("ollama Python package is not installed")
+	timeout = int(request_timeout_seconds) if request_timeout_seconds is not None else _DEFAULT_TIMEOUT
+	client = _get_client(_DEFAULT_HOST, timeout)
+	try:
+		for part in client.chat(
 			model=model,
-			messages=messages,
+			messages=[
+				{"role": "system", "content": system_prompt},
+				{"role": "user", "content": user_prompt},
+			],
 			options={
 				"temperature": temperature,
 				"num_predict": max_output_tokens,
-				"num_ctx": adjusted_num_ctx,
+				"num_ctx": int(num_ctx) if num_ctx is not None else _DEFAULT_NUM_CTX,
 			},
-		)
+			keep_alive=_KEEP_ALIVE,
+			stream=True,
+		):
+			content = (part.get("message") or {}).get("content")
+			if content:
+				yield content
+	except httpx.TimeoutException:
+		raise RuntimeError(f"Ollama chat timed out after {timeout}s")
 
-	with ThreadPoolExecutor(max_workers=1) as executor:
-		future = executor.submit(_do_chat)
-		try:
-			resp: Dict[str, Any] = future.result(timeout=effective_timeout)
-		except FuturesTimeout:
-			future.cancel()
-			raise RuntimeError(f"Ollama chat timed out after {effective_timeout}s")
 
-	message = resp.get("message") or {}
-	content: str = message.get("content", "{}")
-	return content
+def chat_json_batch(
+	items: List[Dict[str, Any]],
+	*,
+	model: str,
+	max_workers: int = 8,
+	**options: Any,
+) -> List[str]:
+	"""Run chat_json for many prompts concurrently and return the contents in the order of items.
+
+	Each item holds system_prompt and user_prompt (and may override any chat_json option);
+	options apply to every item. All calls share the pooled client, whose keep-alive limit
+	(40) stays above max_workers. The first failure is raised and unstarted calls are dropped.
+	"""
+	results: List[str] = [""] * len(items)
+	if not items:
+		return results
+	with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as executor:
+		futures = {executor.submit(chat_json, **{"model": model, **options, **item}): i for i, item in enumerate(items)}
+		try:
+			for future in as_completed(futures):
+				results[futures[future]] = future.result()
+		except BaseException:
+			for future in futures:
+				future.cancel()
+			raise
+	return results
 
 
 def chat_conversational(
@@ -90,10 +212,9 @@ def chat_conversational(
 
 	This function supports conversational chat with message history.
 	"""
-	host = os.getenv("OLLAMA_HOST", "http://127.0.0.1:11434")
+	host = _DEFAULT_HOST
 	if Client is None:
 		raise RuntimeError("ollama Python package is not installed")
-	client = Client(host=host)
 
 	# Build messages list with history
 	messages: List[Dict[str, str]] = [
@@ -102,211 +223,135 @@ def chat_conversational(
 	
 	# Add message history if provided
 	if message_history:
-		print(f"📝 Adding {len(message_history)} history messages to context")
-		# Validate and clean message history
-		valid_history = []
-		for msg in message_history:
-			if isinstance(msg, dict) and "role" in msg and "content" in msg:
-				if msg["role"] in ["user", "assistant"] and msg["content"].strip():
-					valid_history.append({
-						"role": msg["role"],
-						"content": msg["content"].strip()
-					})
+		logger.debug("📝 Adding %d history messages to context", len(message_history))
+		# Keep user/assistant turns with non-empty content, stripped once each
+		valid_history = [
+			{"role": role, "content": content}
+			for msg in message_history
+			if isinstance(msg, dict)
+			for role, content in ((msg.get("role"), (msg.get("content") or "").strip()),)
+			if role in ("user", "assistant") and content
+		]
 		
 		if valid_history:
 			messages.extend(valid_history)
-			print(f"📝 Added {len(valid_history)} valid history messages")
+			logger.debug("📝 Added %d valid history messages", len(valid_history))
 		else:
-			print("📝 No valid history messages found")
+			logger.debug("📝 No valid history messages found")
 	
 	# Add current user message
 	messages.append({"role": "user", "content": user_message})
 	
-	# Debug: Show final message structure
-	print(f"📝 Final message structure: {len(messages)} total messages")
-	for i, msg in enumerate(messages):
-		print(f"  {i+1}. {msg['role']}: {msg['content'][:50]}...")
+	if logger.isEnabledFor(logging.DEBUG):
+		_log_messages(messages)
+
+	effective_timeout = int(request_timeout_seconds) if request_timeout_seconds is not None else _DEFAULT_TIMEOUT
+	effective_num_ctx = int(num_ctx) if num_ctx is not None else _DEFAULT_NUM_CTX
+	# Adjust context window based on message count
+	adjusted_num_ctx = effective_num_ctx
+	if len(messages) > 15:
+		# Increase context window for long conversations
+		adjusted_num_ctx = min(effective_num_ctx * 2, 8192)  # Cap at 8K
+		logger.debug("📝 Adjusted context window to %d for long conversation", adjusted_num_ctx)
+
+	resp = _chat(
+		host=host,
+		timeout=effective_timeout,
+		model=model,
+		messages=messages,
+		options={
+			"temperature": temperature,
+			"num_predict": max_output_tokens,
+			"num_ctx": adjusted_num_ctx,
+		},
+	)
+
+	message = resp.get("message") or {}
+	content: str = message.get("content", "")
 	
-	# Validate message structure
+	if not message_history:
+		# First turn: nothing to check the reply against
+		return content
+	if logger.isEnabledFor(logging.DEBUG):
+		_log_response_quality(message_history, user_message, content)
+
+	return content
+
+
+# Keyword groups reported by _log_messages when any message contains one of them
+_CONTEXT_KEYWORDS = (
+	(('نام', 'اسم'), "📝 Context contains name/identity information"),
+	(('مشکل', 'خطا'), "📝 Context contains problem/error information"),
+	(('؟', '?'), "📝 Context contains questions"),
+)
+
+
+def _log_messages(messages: List[Dict[str, str]]) -> None:
+	"""Debug summary of the messages about to be sent (only called when DEBUG is enabled)."""
+	logger.debug("📝 Final message structure: %d total messages", len(messages))
+	for i, msg in enumerate(messages):
+		logger.debug("  %d. %s: %s...", i + 1, msg["role"], msg["content"][:50])
+
 	if len(messages) > 20:
-		print(f"⚠️ Warning: Large message context ({len(messages)} messages) may affect performance")
-	
-	# Check for proper conversation flow
-	user_count = sum(1 for msg in messages if msg['role'] == 'user')
-	assistant_count = sum(1 for msg in messages if msg['role'] == 'assistant')
-	print(f"📝 Message balance: {user_count} user, {assistant_count} assistant messages")
-	
-	# Check for conversation quality
+		logger.debug("⚠️ Large message context (%d messages) may affect performance", len(messages))
+
+	# Check for proper conversation flow (one pass over the roles)
+	role_counts = Counter(msg['role'] for msg in messages)
+	user_count, assistant_count = role_counts['user'], role_counts['assistant']
+	logger.debug("📝 Message balance: %d user, %d assistant messages", user_count, assistant_count)
 	if user_count > 0 and assistant_count > 0:
 		balance_ratio = user_count / assistant_count
 		if balance_ratio > 2:
-			print("⚠️ Warning: User messages significantly outnumber assistant messages")
+			logger.debug("⚠️ User messages significantly outnumber assistant messages")
 		elif balance_ratio < 0.5:
-			print("⚠️ Warning: Assistant messages significantly outnumber user messages")
-		else:
-			print("✅ Good conversation balance")
-	
-	# Check for important content
-	all_content = " ".join([msg['content'] for msg in messages])
-	if 'نام' in all_content or 'اسم' in all_content:
-		print("📝 Context contains name/identity information")
-	if 'مشکل' in all_content or 'خطا' in all_content:
-		print("📝 Context contains problem/error information")
-	if '؟' in all_content or '?' in all_content:
-		print("📝 Context contains questions")
-
-	effective_timeout = (
-		int(request_timeout_seconds)
-		if request_timeout_seconds is not None
-		else int(os.getenv("REQUEST_TIMEOUT_SECONDS", "120"))
-	)
-	effective_num_ctx = (
-		int(num_ctx)
-		if num_ctx is not None
-		else int(os.getenv("NUM_CTX", os.getenv("CONTEXT_WINDOW", "4096")))
-	)
+			logger.debug("⚠️ Assistant messages significantly outnumber user messages")
 
-	def _do_chat() -> Dict[str, Any]:
-		# Adjust context window based on message count
-		adjusted_num_ctx = effective_num_ctx
-		if len(messages) > 15:
-			# Increase context window for long conversations
-			adjusted_num_ctx = min(effective_num_ctx * 2, 8192)  # Cap at 8K
-			print(f"📝 Adjusted context window to {adjusted_num_ctx} for long conversation")
-		
-		return client.chat(
-			model=model,
-			messages=messages,
-			options={
-				"temperature": temperature,
-				"num_predict": max_output_tokens,
-				"num_ctx": adjusted_num_ctx,
-			},
-		)
+	# Check for important content; each scan stops at the first message that matches
+	for keywords, note in _CONTEXT_KEYWORDS:
+		if any(kw in msg['content'] for msg in messages for kw in keywords):
+			logger.debug(note)
 
-	with ThreadPoolExecutor(max_workers=1) as executor:
-		future = executor.submit(_do_chat)
-		try:
-			resp: Dict[str, Any] = future.result(timeout=effective_timeout)
-		except FuturesTimeout:
-			future.cancel()
-			raise RuntimeError(f"Ollama chat timed out after {effective_timeout}s")
 
-	message = resp.get("message") or {}
-	content: str = message.get("content", "")
-	
-	# Log response quality
-	print(f"📝 Generated response: {len(content)} characters")
-	if len(content) < 10:
-		print("⚠️ Warning: Very short response from model")
-	elif len(content) > 1000:
-		print("📝 Long response from model")
-	
-	# Check if response seems to consider history
-	if message_history and len(message_history) > 0:
-		history_indicators = ['قبلاً', 'سابقاً', 'گفتم', 'گفتید', 'قبل', 'پیش', 'همان', 'همین']
-		considers_history = any(indicator in content for indicator in history_indicators)
-		if considers_history:
-			print("✅ Model response appears to consider conversation history")
-		else:
-			print("⚠️ Model response may not be considering conversation history")
-		
-		# Check for specific references to previous messages
-		has_specific_reference = any(
-			msg['content'] in content or 
-			(len(msg['content']) > 10 and msg['content'][:10] in content)
-			for msg in message_history
-		)
-		if has_specific_reference:
-			print("✅ Model response contains specific reference to previous message")
-		
-		# Check for continuity in conversation
-		has_continuity = any(
-			msg['role'] == 'user' and msg['content'].lower()[:5] in content.lower()
-			for msg in message_history
-		)
-		if has_continuity:
-			print("✅ Model response shows good conversation continuity")
-		
-		# Check for context awareness
-		has_context_awareness = any(
-			msg['role'] == 'assistant' and msg['content'].lower()[:5] in content.lower()
-			for msg in message_history
-		)
-		if has_context_awareness:
-			print("✅ Model response shows context awareness from previous assistant messages")
-		
-		# Overall conversation quality assessment
-		quality_indicators = [
-			considers_history,
-			has_specific_reference,
-			has_continuity,
-			has_context_awareness
-		]
-		quality_score = sum(quality_indicators)
-		print(f"📝 Model conversation quality score: {quality_score}/4")
-		
-		if quality_score >= 3:
-			print("✅ Excellent model conversation quality")
-		elif quality_score >= 2:
-			print("✅ Good model conversation quality")
-		elif quality_score >= 1:
-			print("⚠️ Fair model conversation quality")
-		else:
-			print("⚠️ Poor model conversation quality - may not be considering history")
-		
-		# Store quality score for potential future use
-		if quality_score < 2:
-			print("⚠️ Consider improving conversation context or model parameters")
-		
-		# Log conversation summary for debugging
-		print(f"📝 Model conversation summary: {len(message_history)} messages, quality: {quality_score}/4")
-		if message_history:
-			last_user_message = next((msg for msg in reversed(message_history) if msg['role'] == 'user'), None)
-			last_assistant_message = next((msg for msg in reversed(message_history) if msg['role'] == 'assistant'), None)
-			if last_user_message:
-				print(f"📝 Last user message: \"{last_user_message['content'][:50]}...\"")
-			if last_assistant_message:
-				print(f"📝 Last assistant message: \"{last_assistant_message['content'][:50]}...\"")
-		
-		# Log current message for context
-		print(f"📝 Current user message: \"{user_message[:50]}...\"")
-		print(f"📝 Current model response: \"{content[:50]}...\"")
-		
-		# Log conversation flow for debugging
-		print(f"📝 Model conversation flow: {len(message_history)} previous messages → current exchange")
-		if message_history:
-			user_messages = sum(1 for msg in message_history if msg['role'] == 'user')
-			assistant_messages = sum(1 for msg in message_history if msg['role'] == 'assistant')
-			print(f"📝 Previous flow: {user_messages} user messages, {assistant_messages} assistant messages")
-		
-		# Log conversation quality metrics
-		print(f"📝 Model quality metrics: History consideration: {considers_history}, Specific refs: {has_specific_reference}, Continuity: {has_continuity}, Context awareness: {has_context_awareness}")
-		
-		# Log conversation health check
-		health_check = {
-			'has_history': len(message_history) > 0,
-			'has_quality': quality_score >= 2,
-			'has_continuity': has_continuity,
-			'has_context': has_context_awareness
-		}
-		print(f"📝 Model conversation health check: {health_check}")
-		
-		if not health_check['has_history']:
-			print("⚠️ No conversation history available")
-		if not health_check['has_quality']:
-			print("⚠️ Low model conversation quality detected")
-		
-		# Log conversation improvement suggestions
-		if quality_score < 2:
-			print("💡 Suggestions for better model conversation quality:")
-			if not considers_history:
-				print("  - Model may need better history context")
-			if not has_specific_reference:
-				print("  - Model may need to reference specific previous messages")
-			if not has_continuity:
-				print("  - Model may need better conversation continuity")
-			if not has_context_awareness:
-				print("  - Model may need better context awareness")
-	
-	return content
\ No newline at end of file
+# Words suggesting a (Persian) reply refers back to earlier turns
+_HISTORY_INDICATORS = ('قبلاً', 'سابقاً', 'گفتم', 'گفتید', 'قبل', 'پیش', 'همان', 'همین')
+_HISTORY_INDICATOR_RE = re.compile("|".join(map(re.escape, _HISTORY_INDICATORS)))
+
+
+def _log_response_quality(history: List[Dict[str, str]], user_message: str, content: str) -> None:
+	"""Debug heuristics on whether the reply uses the conversation history (only called when DEBUG is enabled)."""
+	content_lower = content.lower()
+	considers_history = _HISTORY_INDICATOR_RE.search(content) is not None
+	# One pass over the history for all per-message checks
+	has_specific_reference = has_continuity = has_context_awareness = False
+	user_count = 0
+	last_user = last_assistant = None
+	for msg in history:
+		text = msg['content']
+		if text in content or (len(text) > 10 and text[:10] in content):
+			has_specific_reference = True
+		if msg['role'] == 'user':
+			user_count += 1
+			last_user = msg
+			if text.lower()[:5] in content_lower:
+				has_continuity = True
+		elif msg['role'] == 'assistant':
+			last_assistant = msg
+			if text.lower()[:5] in content_lower:
+				has_context_awareness = True
+	quality_score = sum([considers_history, has_specific_reference, has_continuity, has_context_awareness])
+
+	logger.debug("📝 Generated response: %d characters", len(content))
+	logger.debug("📝 Model conversation summary: %d messages, quality: %d/4", len(history), quality_score)
+	logger.debug(
+		"📝 Model quality metrics: History consideration: %s, Specific refs: %s, Continuity: %s, Context awareness: %s",
+		considers_history, has_specific_reference, has_continuity, has_context_awareness,
+	)
+	logger.debug("📝 Previous flow: %d user messages, %d assistant messages", user_count, len(history) - user_count)
+	if last_user is not None:
+		logger.debug("📝 Last user message: \"%s...\"", last_user['content'][:50])
+	if last_assistant is not None:
+		logger.debug("📝 Last assistant message: \"%s...\"", last_assistant['content'][:50])
+	logger.debug("📝 Current user message: \"%s...\"", user_message[:50])
+	logger.debug("📝 Current model response: \"%s...\"", content[:50])
+	if quality_score < 2:
+		logger.debug("⚠️ Low model conversation quality - may not be considering history")
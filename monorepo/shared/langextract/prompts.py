@@ -1,7 +1,30 @@
-from typing import Any, Dict, List
+import json
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Sequence
+
+try:
+	import orjson
+except Exception:  # pragma: no cover
+	orjson = None  # type: ignore
 
 from .schemas import get_schema_instructions
 
+# Bump whenever prompt text or few-shots change so cached LLM results are not reused
+PROMPT_VERSION = "2"
+
+
+def _json_dumps(value: Any) -> str:
+	return orjson.dumps(value).decode() if orjson is not None else json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _render_shots(few_shots: List[Dict[str, Any]]) -> str:
+	# Shots are shown as the minified JSON the model is asked to produce (not Python reprs)
+	return "\n\n".join(
+		f"TEXT:\n{ex['text']}\nJSON:\n{_json_dumps({'entities': ex.get('entities', []), 'relationships': ex.get('relationships', [])})}"
+		for ex in few_shots
+	)
+
 
 FEW_SHOT_FA: List[Dict[str, Any]] = [
 	{
@@ -17,6 +40,8 @@ FEW_SHOT_FA: List[Dict[str, Any]] = [
 		],
 	},
 ]
+# Each few-shot list is rendered once next to its definition; *_RENDERED is the text that goes into the prompt
+FEW_SHOT_FA_RENDERED: str = _render_shots(FEW_SHOT_FA)
 
 # Police domain example with inference
 FEW_SHOT_POLICE_FA: List[Dict[str, Any]] = [
@@ -35,6 +60,7 @@ FEW_SHOT_POLICE_FA: List[Dict[str, Any]] = [
 		],
 	},
 ]
+FEW_SHOT_POLICE_FA_RENDERED: str = _render_shots(FEW_SHOT_POLICE_FA)
 
 FEW_SHOT_EN: List[Dict[str, Any]] = [
 	{
@@ -51,9 +77,19 @@ FEW_SHOT_EN: List[Dict[str, Any]] = [
 		],
 	},
 ]
+FEW_SHOT_EN_RENDERED: str = _render_shots(FEW_SHOT_EN)
+
+
+def _frozen(table: Dict[str, Any]) -> Mapping[str, Any]:
+	"""Read-only view of a per-domain table; nested dicts become read-only views and lists become tuples."""
+	return MappingProxyType({
+		key: MappingProxyType(value) if isinstance(value, dict) else tuple(value) if isinstance(value, list) else value
+		for key, value in table.items()
+	})
+
 
 # Domain-specific prompts
-DOMAIN_PROMPTS = {
+DOMAIN_PROMPTS: Mapping[str, Mapping[str, str]] = _frozen({
 	"general": {
 		"fa": "شما یک موتور استخراج اطلاعات دقیق هستید. متن‌های عمومی را تحلیل کنید و موجودیت‌ها، روابط و استنتاج‌های منطقی را شناسایی کنید. احتمالات و ریسک‌ها را ارزیابی کنید.",
 		"en": "You are a precise information extraction engine for general texts. Identify important entities, relationships, and logical inferences. Assess probabilities and risks."
@@ -70,17 +106,21 @@ DOMAIN_PROMPTS = {
 		"fa": "شما یک تحلیلگر امنیتی هستید که اسناد پلیسی و امنیتی را بررسی می‌کنید. بر مظنونان، مجرمان، جرائم، شاهدان، مکان‌های وقوع، زمان، شواهد و روابط جرمی تمرکز کنید. رفتارهای مشکوک، انگیزه‌های احتمالی، و سطح تهدید را تحلیل و استنتاج کنید. احتمال وقوع جرم را ارزیابی کنید.",
 		"en": "You are a security analyst reviewing police and security documents. Focus on suspects, criminals, crimes, witnesses, locations, times, evidence, and criminal relationships. Analyze and infer suspicious behaviors, potential motives, and threat levels. Assess crime probability."
 	}
-}
+})
 
 # Domain-specific entity types
-DOMAIN_ENTITY_TYPES = {
+DOMAIN_ENTITY_TYPES: Mapping[str, Sequence[str]] = _frozen({
 	"general": ["PERSON", "ORGANIZATION", "LOCATION", "DATE", "TIME", "EVENT", "PRODUCT", "MONEY", "INFERENCE", "RISK_ASSESSMENT"],
 	"legal": ["PERSON", "LEGAL_ENTITY", "COURT", "LAW", "LEGAL_ARTICLE", "CONTRACT", "CASE_NUMBER", "DATE", "LOCATION", "FINE", "SENTENCE", "LEGAL_INFERENCE", "VIOLATION_RISK"],
 	"medical": ["PATIENT", "DOCTOR", "HOSPITAL", "DISEASE", "SYMPTOM", "TREATMENT", "MEDICATION", "TEST", "BODY_PART", "DATE", "DOSAGE", "MEDICAL_INFERENCE", "HEALTH_RISK"],
 	"police": ["SUSPECT", "VICTIM", "WITNESS", "CRIME", "LOCATION", "DATE", "TIME", "EVIDENCE", "WEAPON", "VEHICLE", "CASE_NUMBER", "OFFICER", "CRIMINAL_INFERENCE", "THREAT_LEVEL", "MOTIVE", "SUSPICIOUS_BEHAVIOR"]
-}
+})
+
+_ENTITY_TYPES_STR = MappingProxyType({domain: ", ".join(types) for domain, types in DOMAIN_ENTITY_TYPES.items()})
 
 
+# Same arguments always give the same string, so every chunk and model call shares one byte-identical prefix
+@lru_cache(maxsize=64)
 def build_system_prompt(*, language: str, schema_name: str, domain: str = "general") -> str:
 	schema_instruction = get_schema_instructions(schema_name)
 	
@@ -89,8 +129,7 @@ def build_system_prompt(*, language: str, schema_name: str, domain: str = "gener
 	domain_instruction = domain_prompt.get(language, domain_prompt["en"])
 	
 	# Get domain-specific entity types
-	entity_types = DOMAIN_ENTITY_TYPES.get(domain, DOMAIN_ENTITY_TYPES["general"])
-	entity_types_str = ", ".join(entity_types)
+	entity_types_str = _ENTITY_TYPES_STR.get(domain, _ENTITY_TYPES_STR["general"])
 	
 	return (
 		f"{domain_instruction}\n"
@@ -100,43 +139,38 @@ def build_system_prompt(*, language: str, schema_name: str, domain: str = "gener
 	)
 
 
-def build_user_prompt(*, text: str, language: str, examples: List[Dict[str, Any]], domain: str = "general") -> str:
-	few_shots = examples
-	if not few_shots:
-		# Use domain-specific examples if available
-		if domain == "police" and language.lower().startswith("fa"):
-			few_shots = FEW_SHOT_POLICE_FA
-		else:
-			few_shots = FEW_SHOT_FA if language.lower().startswith("fa") else FEW_SHOT_EN
-
-	shots_str_items: List[str] = []
-	for ex in few_shots:
-		shots_str_items.append(
-			f"TEXT:\n{ex['text']}\nJSON:\n" + "{" + f"\"entities\": {ex.get('entities', [])}, \"relationships\": {ex.get('relationships', [])}" + "}"
-		)
-	shots_str = "\n\n".join(shots_str_items)
-
-	# Domain-specific inference instructions
-	inference_instructions = {
-		"general": {
-			"fa": "علاوه بر موجودیت‌ها و روابط مستقیم، استنتاج‌های منطقی و احتمالات را نیز شناسایی کنید.",
-			"en": "In addition to direct entities and relationships, identify logical inferences and probabilities."
-		},
-		"police": {
-			"fa": "ویژه: رفتارهای مشکوک، احتمال وقوع جرم، انگیزه‌های احتمالی و سطح تهدید را تحلیل و استنتاج کنید. اگر متن حاکی از احتمال جرم است، آن را به عنوان CRIMINAL_INFERENCE یا SUSPICIOUS_BEHAVIOR شناسایی کنید.",
-			"en": "Special: Analyze and infer suspicious behaviors, crime probability, potential motives, and threat levels. If the text suggests possible crime, identify it as CRIMINAL_INFERENCE or SUSPICIOUS_BEHAVIOR."
-		},
-		"legal": {
-			"fa": "ویژه: احتمال نقض قوانین، خطرات حقوقی و استنتاج‌های قانونی را شناسایی کنید.",
-			"en": "Special: Identify probability of law violations, legal risks, and legal inferences."
-		},
-		"medical": {
-			"fa": "ویژه: خطرات سلامتی، احتمالات تشخیصی و استنتاج‌های پزشکی را شناسایی کنید.",
-			"en": "Special: Identify health risks, diagnostic probabilities, and medical inferences."
-		}
+# Domain-specific inference instructions
+INFERENCE_INSTRUCTIONS: Mapping[str, Mapping[str, str]] = _frozen({
+	"general": {
+		"fa": "علاوه بر موجودیت‌ها و روابط مستقیم، استنتاج‌های منطقی و احتمالات را نیز شناسایی کنید.",
+		"en": "In addition to direct entities and relationships, identify logical inferences and probabilities."
+	},
+	"police": {
+		"fa": "ویژه: رفتارهای مشکوک، احتمال وقوع جرم، انگیزه‌های احتمالی و سطح تهدید را تحلیل و استنتاج کنید. اگر متن حاکی از احتمال جرم است، آن را به عنوان CRIMINAL_INFERENCE یا SUSPICIOUS_BEHAVIOR شناسایی کنید.",
+		"en": "Special: Analyze and infer suspicious behaviors, crime probability, potential motives, and threat levels. If the text suggests possible crime, identify it as CRIMINAL_INFERENCE or SUSPICIOUS_BEHAVIOR."
+	},
+	"legal": {
+		"fa": "ویژه: احتمال نقض قوانین، خطرات حقوقی و استنتاج‌های قانونی را شناسایی کنید.",
+		"en": "Special: Identify probability of law violations, legal risks, and legal inferences."
+	},
+	"medical": {
+		"fa": "ویژه: خطرات سلامتی، احتمالات تشخیصی و استنتاج‌های پزشکی را شناسایی کنید.",
+		"en": "Special: Identify health risks, diagnostic probabilities, and medical inferences."
 	}
-	
-	domain_instruction = inference_instructions.get(domain, inference_instructions["general"])
+})
+
+
+def _render_user_prefix(language: str, examples: List[Dict[str, Any]], domain: str) -> str:
+	"""Everything in the user prompt before the input text."""
+	if examples:
+		shots_str = _render_shots(examples)
+	# Use domain-specific examples if available
+	elif domain == "police" and language.lower().startswith("fa"):
+		shots_str = FEW_SHOT_POLICE_FA_RENDERED
+	else:
+		shots_str = FEW_SHOT_FA_RENDERED if language.lower().startswith("fa") else FEW_SHOT_EN_RENDERED
+
+	domain_instruction = INFERENCE_INSTRUCTIONS.get(domain, INFERENCE_INSTRUCTIONS["general"])
 	instruction_text = domain_instruction.get(language, domain_instruction["en"])
 
 	return (
@@ -145,31 +179,42 @@ def build_user_prompt(*, text: str, language: str, examples: List[Dict[str, Any]
 		f"{instruction_text}\n"
 		"If unsure, leave arrays empty.\n\n"
 		f"FEW-SHOTS:\n{shots_str}\n\n"
-		f"NOW EXTRACT FROM THIS TEXT:\n{text}\n"
 	)
 
 
+# Built-in few-shots only depend on language and domain, so that prefix is rendered once per pair
+@lru_cache(maxsize=64)
+def _default_user_prefix(language: str, domain: str) -> str:
+	return _render_user_prefix(language, [], domain)
+
+
+def build_user_prompt(*, text: str, language: str, examples: List[Dict[str, Any]], domain: str = "general") -> str:
+	prefix = _render_user_prefix(language, examples, domain) if examples else _default_user_prefix(language, domain)
+	return f"{prefix}NOW EXTRACT FROM THIS TEXT:\n{text}\n"
+
+
+# Referee prompt: what kind of analysis is being judged, and the extra (Persian) focus per domain
+_REFEREE_DOMAIN_CONTEXT: Mapping[str, Mapping[str, str]] = _frozen({
+	"general": {"fa": "تحلیل عمومی متن", "en": "general text analysis"},
+	"legal": {"fa": "تحلیل متن حقوقی", "en": "legal text analysis"},
+	"medical": {"fa": "تحلیل متن پزشکی", "en": "medical text analysis"},
+	"police": {"fa": "تحلیل متن امنیتی/پلیسی", "en": "police/security text analysis"}
+})
+_REFEREE_NOTES_FA: Mapping[str, str] = MappingProxyType({
+	"police": "\nتوجه ویژه: رفتارهای مشکوک، احتمالات جرمی، انگیزه‌ها و استنتاج‌های امنیتی را در نظر بگیرید.",
+	"legal": "\nتوجه ویژه: احتمال نقض قوانین و خطرات حقوقی را ارزیابی کنید.",
+	"medical": "\nتوجه ویژه: خطرات سلامتی و احتمالات تشخیصی را در نظر بگیرید.",
+})
+
+
 def build_referee_prompt(*, text: str, language: str, first_analysis: Dict[str, Any], second_analysis: Dict[str, Any], domain: str = "general") -> str:
 	"""Build prompt for referee model to make final decision"""
 	
-	domain_context = {
-		"general": {"fa": "تحلیل عمومی متن", "en": "general text analysis"},
-		"legal": {"fa": "تحلیل متن حقوقی", "en": "legal text analysis"}, 
-		"medical": {"fa": "تحلیل متن پزشکی", "en": "medical text analysis"},
-		"police": {"fa": "تحلیل متن امنیتی/پلیسی", "en": "police/security text analysis"}
-	}
-	
-	context = domain_context.get(domain, domain_context["general"])
+	context = _REFEREE_DOMAIN_CONTEXT.get(domain, _REFEREE_DOMAIN_CONTEXT["general"])
 	context_str = context.get(language, context["en"])
 	
 	if language.lower().startswith("fa"):
-		inference_note = ""
-		if domain == "police":
-			inference_note = "\nتوجه ویژه: رفتارهای مشکوک، احتمالات جرمی، انگیزه‌ها و استنتاج‌های امنیتی را در نظر بگیرید."
-		elif domain == "legal":
-			inference_note = "\nتوجه ویژه: احتمال نقض قوانین و خطرات حقوقی را ارزیابی کنید."
-		elif domain == "medical":
-			inference_note = "\nتوجه ویژه: خطرات سلامتی و احتمالات تشخیصی را در نظر بگیرید."
+		inference_note = _REFEREE_NOTES_FA.get(domain, "")
 		
 		prompt = f"""شما یک داور متخصص برای {context_str} هستید. دو تحلیل زیر را بررسی کنید و بهترین تحلیل نهایی را ارائه دهید.{inference_note}
 
@@ -1,4 +1,27 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, TypedDict
+
+
+# Plain-dict shapes passed through the pipeline; pydantic models are only used at the API boundary
+class EntityDict(TypedDict):
+	id: Optional[str]
+	name: str
+	type: str
+	start_index: Optional[int]
+	end_index: Optional[int]
+	attributes: Dict[str, Any]
+
+
+class RelationshipDict(TypedDict):
+	id: Optional[str]
+	source_entity_id: str
+	target_entity_id: str
+	type: str
+	attributes: Dict[str, Any]
+
+
+class ExtractionResult(TypedDict):
+	entities: List[EntityDict]
+	relationships: List[RelationshipDict]
 
 _SCHEMAS: Dict[str, str] = {
 	"general": (
@@ -18,7 +41,43 @@ def list_schemas() -> List[str]:
 	return list(_SCHEMAS.keys())
 
 
-def ensure_extraction_shape(data: Dict[str, Any]) -> Dict[str, Any]:
+def _opt_str(value: Any) -> Optional[str]:
+	return None if value is None else str(value)
+
+
+# Integer range orjson can encode; model output beyond it (e.g. a runaway digit string) would
+# fail every later dumps of the result, so it is dropped or turned into a string here
+_JSON_INT_MIN = -(1 << 63)
+_JSON_INT_MAX = (1 << 64) - 1
+
+
+def _opt_int(value: Any) -> Optional[int]:
+	# Model output is nearly always a plain int or missing; settle those before the general path
+	if value is None:
+		return None
+	if type(value) is not int:
+		if isinstance(value, bool):
+			return None
+		try:
+			value = int(value)
+		except (TypeError, ValueError, OverflowError):
+			return None
+	return value if _JSON_INT_MIN <= value <= _JSON_INT_MAX else None
+
+
+def _json_safe(value: Any) -> Any:
+	"""value with integers outside the encodable range replaced by their decimal strings."""
+	if type(value) is int:
+		return value if _JSON_INT_MIN <= value <= _JSON_INT_MAX else str(value)
+	if isinstance(value, dict):
+		return {k: _json_safe(v) for k, v in value.items()}
+	if isinstance(value, list):
+		return [_json_safe(v) for v in value]
+	return value
+
+
+def ensure_extraction_shape(data: Dict[str, Any]) -> ExtractionResult:
+	"""Drop malformed items and coerce fields to the Entity/Relationship types, so results can be served without re-validation."""
 	entities = data.get("entities")
 	relationships = data.get("relationships")
 	if not isinstance(entities, list):
@@ -26,7 +85,7 @@ def ensure_extraction_shape(data: Dict[str, Any]) -> Dict[str, Any]:
 	if not isinstance(relationships, list):
 		relationships = []
 	# Normalize entity fields
-	norm_entities: List[Dict[str, Any]] = []
+	norm_entities: List[EntityDict] = []
 	for e in entities:
 		if not isinstance(e, dict):
 			continue
@@ -34,17 +93,18 @@ def ensure_extraction_shape(data: Dict[str, Any]) -> Dict[str, Any]:
 		type_ = e.get("type")
 		if not name or not type_:
 			continue
-		item = {
-			"id": e.get("id"),
+		attributes = e.get("attributes")
+		item: EntityDict = {
+			"id": _opt_str(e.get("id")),
 			"name": str(name),
 			"type": str(type_),
-			"start_index": e.get("start_index"),
-			"end_index": e.get("end_index"),
-			"attributes": e.get("attributes") or {},
+			"start_index": _opt_int(e.get("start_index")),
+			"end_index": _opt_int(e.get("end_index")),
+			"attributes": _json_safe(attributes) if isinstance(attributes, dict) else {},
 		}
 		norm_entities.append(item)
 
-	norm_relationships: List[Dict[str, Any]] = []
+	norm_relationships: List[RelationshipDict] = []
 	for r in relationships:
 		if not isinstance(r, dict):
 			continue
@@ -53,13 +113,14 @@ def ensure_extraction_shape(data: Dict[str, Any]) -> Dict[str, Any]:
 		type_ = r.get("type")
 		if not se or not te or not type_:
 			continue
-		item = {
-			"id": r.get("id"),
+		attributes = r.get("attributes")
+		rel: RelationshipDict = {
+			"id": _opt_str(r.get("id")),
 			"source_entity_id": str(se),
 			"target_entity_id": str(te),
 			"type": str(type_),
-			"attributes": r.get("attributes") or {},
+			"attributes": _json_safe(attributes) if isinstance(attributes, dict) else {},
 		}
-		norm_relationships.append(item)
+		norm_relationships.append(rel)
 
 	return {"entities": norm_entities, "relationships": norm_relationships}
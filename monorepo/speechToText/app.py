@@ -1,15 +1,69 @@
+import asyncio
+import logging
 import os
+import shutil
+import struct
+import subprocess
 import tempfile
-import time
-import uuid
-from typing import Optional
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+# Size OpenMP to the CPUs this process may actually run on; must be set before CTranslate2 loads
+CPU_THREADS = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+os.environ.setdefault("OMP_NUM_THREADS", str(CPU_THREADS))
+
 from fastapi import FastAPI, HTTPException, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-import whisper
-import torch
+import numpy as np
+import ctranslate2
+from faster_whisper import BatchedInferencePipeline, WhisperModel
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+# Resolved once at startup instead of searching PATH on every request; None means only WAV fast-path uploads decode
+FFMPEG_PATH = shutil.which("ffmpeg")
+DEFAULT_MODEL_SIZE = "large"
+# Sizes a client may ask for; anything else is rejected before it can trigger a download or load
+MODEL_SIZES = frozenset({
+    "tiny", "tiny.en", "base", "base.en", "small", "small.en", "medium", "medium.en",
+    "large", "large-v1", "large-v2", "large-v3", "large-v3-turbo", "turbo",
+    "distil-small.en", "distil-medium.en", "distil-large-v2", "distil-large-v3",
+})
+# Transcriptions running at once; each gets its own CTranslate2 worker and a share of the CPU threads
+TRANSCRIBE_CONCURRENCY = max(1, int(os.getenv("STT_CONCURRENCY", "2")))
+_TRANSCRIBE_SEMAPHORE = asyncio.Semaphore(TRANSCRIBE_CONCURRENCY)
+# Chat clips are short single turns: greedy decoding, no cross-window conditioning
+CHAT_DECODE_OPTIONS = {"beam_size": 1, "condition_on_previous_text": False}
+CHAT_INITIAL_PROMPTS = {"fa": "گفتگو به زبان فارسی."}
+# Silero VAD (bundled with faster-whisper) drops silence before it reaches the encoder
+VAD_PARAMETERS = {"min_silence_duration_ms": 500}
+# Speech chunks of one chat clip decoded together by the batched pipeline
+CHAT_BATCH_SIZE = int(os.getenv("STT_CHAT_BATCH_SIZE", "8"))
+
+# Uploads larger than this are rejected with 413 before they are buffered
+MAX_UPLOAD_BYTES = int(os.getenv("STT_MAX_UPLOAD_MB", "25")) * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Most model sizes kept in memory at once; the default size is never evicted
+MAX_LOADED_MODELS = int(os.getenv("STT_MAX_MODELS", "2"))
 
-app = FastAPI(title="Speech-to-Text Service", version="1.0.0")
+# Loaded whisper models by size, least recently used first
+_models: "OrderedDict[str, WhisperModel]" = OrderedDict()
+_model_locks: Dict[str, asyncio.Lock] = {}
+batched_model = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load and warm the default Whisper model once, before the first request is accepted"""
+    global batched_model
+    model = await get_model(DEFAULT_MODEL_SIZE)
+    await asyncio.to_thread(_warmup, model)
+    batched_model = BatchedInferencePipeline(model=model)
+    yield
+
+app = FastAPI(title="Speech-to-Text Service", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -20,120 +74,211 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global whisper model
-whisper_model = None
+def _device_settings():
+    """Pick the CTranslate2 device and compute type: INT8 on CPU, INT8/FP16 on tensor-core GPUs"""
+    # CTranslate2 (faster-whisper's runtime) only lists int8_float16 for GPUs with tensor cores
+    if ctranslate2.get_cuda_device_count() > 0 and "int8_float16" in ctranslate2.get_supported_compute_types("cuda"):
+        return "cuda", "int8_float16"
+    return "cpu", "int8"
 
 class TranscriptionRequest(BaseModel):
     language: Optional[str] = None
-    model_size: str = "large"
+    model_size: str = DEFAULT_MODEL_SIZE
 
 class TranscriptionResponse(BaseModel):
     text: str
     language: str
     confidence: Optional[float] = None
+    # Set when the request succeeded but produced no transcript (e.g. "NO_SPEECH")
+    error_code: Optional[str] = None
 
-def load_whisper_model(model_size: str = "base"):
-    """Load Whisper model with caching"""
-    global whisper_model
-    
-    if whisper_model is None:
-        print(f"Loading Whisper model: {model_size}")
+def api_error(status_code: int, code: str, message: str) -> HTTPException:
+    """HTTPException whose detail carries a stable code clients can branch on"""
+    return HTTPException(status_code=status_code, detail={"code": code, "message": message})
+
+def _build_model(model_size: str):
+    """Construct a faster-whisper model for the current device"""
+    device, compute_type = _device_settings()
+    return WhisperModel(
+        model_size,
+        device=device,
+        compute_type=compute_type,
+        cpu_threads=max(1, CPU_THREADS // TRANSCRIBE_CONCURRENCY),
+        num_workers=TRANSCRIBE_CONCURRENCY,
+    )
+
+def _warmup(model):
+    """Run one second of silence through the model so the first request doesn't pay for it"""
+    segments, _ = model.transcribe(np.zeros(SAMPLE_RATE, np.float32))
+    list(segments)
+
+async def get_model(model_size: str = DEFAULT_MODEL_SIZE):
+    """Return the Whisper model for a size, loading it once and evicting the least recently used"""
+    if model_size not in MODEL_SIZES:
+        raise api_error(400, "UNSUPPORTED_MODEL_SIZE", f"Unsupported model size: {model_size}")
+    model = _models.get(model_size)
+    if model is None:
+        # One lock per size: a slow load doesn't hold up requests for other sizes
+        async with _model_locks.setdefault(model_size, asyncio.Lock()):
+            model = _models.get(model_size)
+            if model is None:
+                logger.info("Loading Whisper model: %s", model_size)
+                try:
+                    model = await asyncio.to_thread(_build_model, model_size)
+                except Exception as e:
+                    logger.error("Error loading Whisper model: %s", e)
+                    raise api_error(503, "MODEL_LOAD_FAILED", f"Failed to load Whisper model: {str(e)}")
+                _models[model_size] = model
+                logger.info("Whisper model %s loaded successfully", model_size)
+                for size in [s for s in _models if s not in (DEFAULT_MODEL_SIZE, model_size)][:max(0, len(_models) - MAX_LOADED_MODELS)]:
+                    del _models[size]
+                    logger.info("Evicted Whisper model: %s", size)
+    _models.move_to_end(model_size)
+    return model
+
+def load_batched_model():
+    """Return the batched pipeline sharing the preloaded model's weights"""
+    if batched_model is None:
+        raise api_error(503, "MODEL_NOT_LOADED", "Whisper model is not loaded")
+    return batched_model
+
+async def read_upload(audio_file: UploadFile) -> bytearray:
+    """Read an upload in fixed-size chunks into one buffer, rejecting it once it exceeds MAX_UPLOAD_BYTES"""
+    size = audio_file.size or 0
+    if size > MAX_UPLOAD_BYTES:
+        raise api_error(413, "UPLOAD_TOO_LARGE", f"Audio file exceeds {MAX_UPLOAD_BYTES} bytes")
+    buf = bytearray(size)
+    view = memoryview(buf)
+    offset = 0
+    while chunk := await audio_file.read(UPLOAD_CHUNK_SIZE):
+        end = offset + len(chunk)
+        if end > MAX_UPLOAD_BYTES:
+            raise api_error(413, "UPLOAD_TOO_LARGE", f"Audio file exceeds {MAX_UPLOAD_BYTES} bytes")
+        if end <= size:
+            view[offset:end] = chunk
+        else:
+            # Size was unknown or understated; grow the buffer
+            view.release()
+            del buf[offset:]
+            buf.extend(chunk)
+            view = memoryview(buf)
+            size = end
+        offset = end
+    view.release()
+    del buf[offset:]
+    return buf
+
+def _wav_pcm16_mono(audio_bytes: bytes) -> Optional[np.ndarray]:
+    """Return the samples of a 16 kHz mono 16-bit PCM WAV as float32, or None for anything else"""
+    if len(audio_bytes) < 12 or audio_bytes[:4] != b"RIFF" or audio_bytes[8:12] != b"WAVE":
+        return None
+    fmt_ok = False
+    pos = 12
+    while pos + 8 <= len(audio_bytes):
+        chunk_id, chunk_size = struct.unpack_from("<4sI", audio_bytes, pos)
+        body = pos + 8
+        if chunk_id == b"fmt " and chunk_size >= 16 and body + 16 <= len(audio_bytes):
+            audio_format, channels, sample_rate = struct.unpack_from("<HHI", audio_bytes, body)
+            bits_per_sample = struct.unpack_from("<H", audio_bytes, body + 14)[0]
+            fmt_ok = audio_format == 1 and channels == 1 and sample_rate == SAMPLE_RATE and bits_per_sample == 16
+            if not fmt_ok:
+                return None
+        elif chunk_id == b"data":
+            if not fmt_ok:
+                return None
+            data = audio_bytes[body:body + chunk_size]
+            data = data[:len(data) - len(data) % 2]
+            # Scale in place so only one float32 buffer is allocated
+            audio = np.frombuffer(data, np.int16).astype(np.float32)
+            audio *= 1.0 / 32768.0
+            return audio
+        # Chunks are word-aligned
+        pos = body + chunk_size + (chunk_size & 1)
+    return None
+
+def decode_audio(audio_bytes: bytes) -> np.ndarray:
+    """Decode any ffmpeg-readable upload to 16 kHz mono float32 PCM"""
+    # Uploads that are already in Whisper's input format skip ffmpeg entirely
+    audio = _wav_pcm16_mono(audio_bytes)
+    if audio is not None:
+        return audio
+    if FFMPEG_PATH is None:
+        raise FileNotFoundError("ffmpeg not found in PATH")
+    # MP4/M4A often keep their index (moov) after the audio, which ffmpeg can only reach by seeking
+    if audio_bytes[4:8] != b"ftyp":
         try:
-            whisper_model = whisper.load_model(model_size)
-            print(f"Whisper model {model_size} loaded successfully")
-        except Exception as e:
-            print(f"Error loading Whisper model: {e}")
-            raise HTTPException(status_code=500, detail=f"Failed to load Whisper model: {str(e)}")
-    
-    return whisper_model
+            return _ffmpeg_decode("pipe:0", audio_bytes)
+        except ValueError as e:
+            logger.debug("Pipe decode failed, retrying from a file: %s", e)
+    return _decode_from_file(audio_bytes)
 
-def simple_transcribe(model, audio_bytes, language):
-    """Real transcription using WebM to WAV conversion + Whisper"""
-    temp_webm_path = None
-    temp_wav_path = None
+def _ffmpeg_decode(source: str, stdin_bytes: Optional[bytes] = None) -> np.ndarray:
+    """Run ffmpeg on source (a path, or pipe:0 fed stdin_bytes) and return 16 kHz mono float32 PCM"""
+    proc = subprocess.Popen(
+        [FFMPEG_PATH, "-nostdin", "-hide_banner", "-loglevel", "error",
+         "-i", source, "-f", "f32le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"],
+        stdin=subprocess.PIPE if stdin_bytes is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    out, err = proc.communicate(stdin_bytes)
+    if proc.returncode != 0:
+        raise ValueError(err.decode("utf-8", "replace").strip() or f"ffmpeg exited with code {proc.returncode}")
+    return np.frombuffer(out, np.float32)
+
+def _decode_from_file(audio_bytes: bytes) -> np.ndarray:
+    """Decode through a seekable temp file, for containers ffmpeg can't read from a pipe"""
+    # Closed before ffmpeg opens it, which Windows requires
+    with tempfile.NamedTemporaryFile(suffix=".audio", delete=False) as f:
+        f.write(audio_bytes)
     try:
-        print(f"Audio data size: {len(audio_bytes)} bytes")
-        
-        # Create WebM file
-        import time
-        timestamp = int(time.time() * 1000)
-        temp_webm_path = os.path.join(os.getcwd(), f"audio_{timestamp}.webm")
-        temp_wav_path = os.path.join(os.getcwd(), f"audio_{timestamp}.wav")
-        
-        # Write WebM file
-        with open(temp_webm_path, 'wb') as f:
-            f.write(audio_bytes)
-            f.flush()
-        
-        print(f"WebM file created: {temp_webm_path}")
-        print(f"File size: {os.path.getsize(temp_webm_path)}")
-        
-        # Convert WebM to WAV using pydub
-        try:
-            from pydub import AudioSegment
-            print("Converting WebM to WAV with pydub...")
-            
-            # Load WebM file
-            audio = AudioSegment.from_file(temp_webm_path, format="webm")
-            
-            # Convert to WAV format with optimal settings for Whisper
-            audio = audio.set_frame_rate(16000).set_channels(1).set_sample_width(2)
-            audio.export(temp_wav_path, format="wav")
-            
-            print(f"WAV file created: {temp_wav_path}")
-            print(f"WAV file size: {os.path.getsize(temp_wav_path)}")
-            
-        except Exception as convert_error:
-            print(f"Pydub conversion failed: {convert_error}")
-            return {"text": f"خطا در تبدیل فایل صوتی: {str(convert_error)}", "language": language, "confidence": 0.0}
-        
-        # Use Whisper to transcribe WAV
-        try:
-            print("Transcribing with Whisper...")
-            result = model.transcribe(temp_wav_path, language=None, fp16=False)
-            text = result["text"].strip()
-            detected_language = result.get("language", "unknown")
-            
-            if text:
-                print(f"Transcription successful: {text}")
-                return {"text": text, "language": detected_language, "confidence": 0.9}
-            else:
-                return {"text": "متأسفانه نتوانستم صدا را تشخیص دهم", "language": language, "confidence": 0.0}
-                
-        except Exception as transcribe_error:
-            print(f"Whisper transcription failed: {transcribe_error}")
-            return {"text": f"خطا در transcription: {str(transcribe_error)}", "language": language, "confidence": 0.0}
-                
-    except Exception as e:
-        print(f"Transcription error: {e}")
-        return {"text": f"خطا در پردازش صدا: {str(e)}", "language": language, "confidence": 0.0}
+        return _ffmpeg_decode(f.name)
     finally:
-        # Clean up files
-        for file_path in [temp_webm_path, temp_wav_path]:
-            if file_path and os.path.exists(file_path):
-                try:
-                    os.unlink(file_path)
-                    print(f"Cleaned up: {file_path}")
-                except:
-                    pass
+        os.unlink(f.name)
 
-def cleanup_old_temp_files():
-    """Clean up old temporary audio files"""
+def simple_transcribe(model, audio_bytes, language, **options):
+    """Real transcription: ffmpeg decodes the upload straight to PCM for Whisper"""
+    logger.debug("Audio data size: %d bytes", len(audio_bytes))
+    
+    # Decode to 16 kHz mono PCM through an ffmpeg pipe (a temp file only for seek-dependent containers)
     try:
-        current_dir = os.getcwd()
-        for filename in os.listdir(current_dir):
-            if (filename.startswith("audio_") and 
-                (filename.endswith(".wav") or filename.endswith(".webm"))):
-                file_path = os.path.join(current_dir, filename)
-                try:
-                    # Check if file is older than 1 hour
-                    if os.path.getmtime(file_path) < time.time() - 3600:
-                        os.unlink(file_path)
-                        print(f"Cleaned up old temp file: {filename}")
-                except Exception as e:
-                    print(f"Could not clean up old temp file {filename}: {e}")
-    except Exception as e:
-        print(f"Error during cleanup: {e}")
+        audio = decode_audio(audio_bytes)
+        logger.debug("Decoded %.2fs of audio", len(audio) / SAMPLE_RATE)
+    except FileNotFoundError as e:
+        logger.error("FFmpeg not found: %s", e)
+        raise api_error(
+            500,
+            "FFMPEG_NOT_FOUND",
+            "FFmpeg is not installed or not in PATH. Please install FFmpeg and add it to your PATH environment variable.",
+        )
+    except Exception as convert_error:
+        logger.warning("FFmpeg decode failed: %s", convert_error)
+        raise api_error(422, "AUDIO_DECODE_FAILED", f"Could not decode audio: {convert_error}")
+    
+    # Use Whisper to transcribe the PCM samples
+    try:
+        logger.debug("Transcribing with Whisper...")
+        options.setdefault("vad_filter", True)
+        options.setdefault("vad_parameters", VAD_PARAMETERS)
+        # Pinning the language skips Whisper's detection pass; "auto" leaves it on
+        whisper_language = None if language in (None, "", "auto") else language
+        segments, info = model.transcribe(audio, language=whisper_language, **options)
+        text = "".join(seg.text for seg in segments).strip()
+        detected_language = info.language or language or "unknown"
+    except Exception as transcribe_error:
+        logger.error("Whisper transcription failed: %s", transcribe_error)
+        raise api_error(500, "TRANSCRIPTION_FAILED", f"Transcription failed: {transcribe_error}")
+    
+    if not text:
+        # A successful decode that heard nothing; not an error the client should retry
+        return {"text": "", "language": detected_language, "confidence": 0.0, "error_code": "NO_SPEECH"}
+    logger.debug("Transcription successful: %s", text)
+    return {"text": text, "language": detected_language, "confidence": 0.9}
+
+async def run_transcription(model, audio_bytes, language, **options):
+    """Run simple_transcribe in a worker thread, at most TRANSCRIBE_CONCURRENCY at once"""
+    async with _TRANSCRIBE_SEMAPHORE:
+        return await asyncio.to_thread(simple_transcribe, model, audio_bytes, language, **options)
 
 @app.get("/health")
 def health_check():
@@ -142,76 +287,64 @@ def health_check():
         "status": "ok",
         "service": "speech-to-text",
         "whisper_available": True,
+        "ffmpeg_available": FFMPEG_PATH is not None,
         "model": "large",
         "supported_languages": ["en", "fa", "auto"],
         "supported_formats": ["webm", "wav", "mp3"],
         "note": "Using Whisper Large model for high-quality Persian speech recognition"
     }
 
+def _check_audio_file(audio_file: UploadFile):
+    """Reject uploads that don't declare an audio content type"""
+    if not audio_file.content_type or not audio_file.content_type.startswith('audio/'):
+        raise api_error(400, "NOT_AUDIO", "File must be an audio file")
+
+async def _transcribe_upload(model, audio_file: UploadFile, language: Optional[str], **options) -> TranscriptionResponse:
+    """Shared body of the transcription endpoints: read, transcribe and map failures to HTTP errors"""
+    try:
+        # Read audio data
+        content = await read_upload(audio_file)
+        
+        # Transcribe using Whisper
+        result = await run_transcription(model, content, language, **options)
+        
+        # Extract text and language
+        transcribed_text = result["text"].strip()
+        detected_language = result.get("language", language or "unknown")
+        
+        # Calculate confidence (average of segment confidences if available)
+        confidence = None
+        if "segments" in result and result["segments"]:
+            confidences = [seg.get("avg_logprob", 0) for seg in result["segments"] if "avg_logprob" in seg]
+            if confidences:
+                # Convert log probability to confidence score (0-1)
+                confidence = min(1.0, max(0.0, (sum(confidences) / len(confidences) + 1) / 2))
+        
+        return TranscriptionResponse(
+            text=transcribed_text,
+            language=detected_language,
+            confidence=confidence,
+            error_code=result.get("error_code"),
+        )
+                
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Transcription error: %s", e)
+        raise api_error(500, "TRANSCRIPTION_FAILED", f"Transcription failed: {str(e)}")
+
 @app.post("/transcribe", response_model=TranscriptionResponse)
 async def transcribe_audio(
     audio_file: UploadFile = File(...),
     language: Optional[str] = Form(None),
-    model_size: str = Form("large")
+    model_size: str = Form(DEFAULT_MODEL_SIZE)
 ):
     """
     Transcribe audio file to text using Whisper
     """
-    try:
-        # Validate file type
-        if not audio_file.content_type or not audio_file.content_type.startswith('audio/'):
-            raise HTTPException(status_code=400, detail="File must be an audio file")
-        
-        # Load Whisper model
-        model = load_whisper_model(model_size)
-        
-        # Read audio data directly
-        content = await audio_file.read()
-        
-        print(f"Audio data size: {len(content)} bytes")
-        
-        # Transcribe using Whisper
-        try:
-            result = simple_transcribe(model, content, language)
-            
-            # Extract text and language
-            transcribed_text = result["text"].strip()
-            detected_language = result.get("language", language or "unknown")
-            
-            # Calculate confidence (average of segment confidences if available)
-            confidence = None
-            if "segments" in result and result["segments"]:
-                confidences = [seg.get("avg_logprob", 0) for seg in result["segments"] if "avg_logprob" in seg]
-                if confidences:
-                    # Convert log probability to confidence score (0-1)
-                    confidence = min(1.0, max(0.0, (sum(confidences) / len(confidences) + 1) / 2))
-            
-            return TranscriptionResponse(
-                text=transcribed_text,
-                language=detected_language,
-                confidence=confidence
-            )
-            
-        except Exception as e:
-            print(f"Transcription error: {e}")
-            raise HTTPException(status_code=500, detail=f"Transcription failed: {e}")
-                
-    except FileNotFoundError as e:
-        if "ffmpeg" in str(e).lower():
-            print(f"FFmpeg not found: {e}")
-            raise HTTPException(
-                status_code=500, 
-                detail="FFmpeg is not installed or not in PATH. Please install FFmpeg and add it to your PATH environment variable."
-            )
-        else:
-            print(f"File not found error: {e}")
-            raise HTTPException(status_code=500, detail=f"File not found: {str(e)}")
-    except ValueError as e:
-        print(f"File validation error: {e}")
-        raise HTTPException(status_code=400, detail=f"Invalid audio file: {str(e)}")
-    except Exception as e:
-        print(f"Transcription error: {e}")
-        raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
+    _check_audio_file(audio_file)
+    model = await get_model(model_size)
+    return await _transcribe_upload(model, audio_file, language)
 
 @app.post("/transcribe-chat", response_model=TranscriptionResponse)
 async def transcribe_for_chat(
@@ -221,62 +354,18 @@ async def transcribe_for_chat(
     """
     Optimized transcription endpoint for chat interface
     """
-    try:
-        # Validate file type
-        if not audio_file.content_type or not audio_file.content_type.startswith('audio/'):
-            raise HTTPException(status_code=400, detail="File must be an audio file")
-        
-        # Load Whisper model
-        model = load_whisper_model("large")
-        
-        # Read audio data
-        content = await audio_file.read()
-        
-        print(f"Chat transcription - Audio data size: {len(content)} bytes")
-        
-        # Transcribe using Whisper
-        try:
-            result = simple_transcribe(model, content, language)
-            
-            # Extract text and language
-            transcribed_text = result["text"].strip()
-            detected_language = result.get("language", language or "unknown")
-            
-            # Calculate confidence (average of segment confidences if available)
-            confidence = None
-            if "segments" in result and result["segments"]:
-                confidences = [seg.get("avg_logprob", 0) for seg in result["segments"] if "avg_logprob" in seg]
-                if confidences:
-                    # Convert log probability to confidence score (0-1)
-                    confidence = min(1.0, max(0.0, (sum(confidences) / len(confidences) + 1) / 2))
-            
-            return TranscriptionResponse(
-                text=transcribed_text,
-                language=detected_language,
-                confidence=confidence
-            )
-            
-        except Exception as e:
-            print(f"Chat transcription error: {e}")
-            raise HTTPException(status_code=500, detail=f"Transcription failed: {e}")
-                
-    except FileNotFoundError as e:
-        if "ffmpeg" in str(e).lower():
-            print(f"FFmpeg not found: {e}")
-            raise HTTPException(
-                status_code=500, 
-                detail="FFmpeg is not installed or not in PATH. Please install FFmpeg and add it to your PATH environment variable."
-            )
-        else:
-            print(f"File not found error: {e}")
-            raise HTTPException(status_code=500, detail=f"File not found: {str(e)}")
-    except ValueError as e:
-        print(f"File validation error: {e}")
-        raise HTTPException(status_code=400, detail=f"Invalid audio file: {str(e)}")
-    except Exception as e:
-        print(f"Chat transcription error: {e}")
-        raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
+    _check_audio_file(audio_file)
+    model = load_batched_model()
+    return await _transcribe_upload(
+        model,
+        audio_file,
+        language,
+        batch_size=CHAT_BATCH_SIZE,
+        initial_prompt=CHAT_INITIAL_PROMPTS.get(language),
+        **CHAT_DECODE_OPTIONS,
+    )
 
 if __name__ == "__main__":
     import uvicorn
+    logging.basicConfig(level=os.getenv("STT_LOG_LEVEL", "INFO"))
     uvicorn.run(app, host="0.0.0.0", port=8001)
@@ -7,56 +7,46 @@ import os
 import urllib.request
 import zipfile
 import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
-def download_file(url, filename):
-    """Download a file from URL"""
-    print(f"Downloading {filename}...")
-    urllib.request.urlretrieve(url, filename)
-    print(f"Downloaded {filename}")
+# Archives up to this size stay in memory while downloading; larger ones spill to a temp file
+SPOOL_MAX_BYTES = 128 * 1024 * 1024
 
-def extract_zip(zip_path, extract_to):
-    """Extract zip file"""
-    print(f"Extracting {zip_path}...")
-    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-        zip_ref.extractall(extract_to)
+MODELS = [
+    # Persian model (small)
+    ("Persian", "https://alphacephei.com/vosk/models/vosk-model-small-fa-0.22.zip", "vosk-model-small-fa-0.22"),
+    # English model (small) - fallback
+    ("English", "https://alphacephei.com/vosk/models/vosk-model-small-en-us-0.15.zip", "vosk-model-small-en-us-0.15"),
+]
+
+def fetch_and_extract(url, extract_to):
+    """Download a zip archive and extract it without writing the .zip next to the models"""
+    print(f"Downloading {url}...")
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as archive:
+        with urllib.request.urlopen(url) as response:
+            shutil.copyfileobj(response, archive, 1024 * 1024)
+        archive.seek(0)
+        print(f"Extracting {url}...")
+        with zipfile.ZipFile(archive) as zip_ref:
+            zip_ref.extractall(extract_to)
     print(f"Extracted to {extract_to}")
 
+def _download_model(name, url, model_dir):
+    if os.path.exists(model_dir):
+        print(f"✅ {name} model already exists!")
+        return
+    try:
+        fetch_and_extract(url, ".")
+        print(f"✅ {name} model downloaded successfully!")
+    except Exception as e:
+        print(f"❌ Failed to download {name} model: {e}")
+
 def download_vosk_models():
-    """Download Vosk models"""
-    
-    # Persian model (small)
-    persian_model_url = "https://alphacephei.com/vosk/models/vosk-model-small-fa-0.22.zip"
-    persian_model_zip = "vosk-model-small-fa-0.22.zip"
-    persian_model_dir = "vosk-model-small-fa-0.22"
-    
-    # English model (small) - fallback
-    english_model_url = "https://alphacephei.com/vosk/models/vosk-model-small-en-us-0.15.zip"
-    english_model_zip = "vosk-model-small-en-us-0.15.zip"
-    english_model_dir = "vosk-model-small-en-us-0.15"
-    
-    # Download Persian model
-    if not os.path.exists(persian_model_dir):
-        try:
-            download_file(persian_model_url, persian_model_zip)
-            extract_zip(persian_model_zip, ".")
-            os.remove(persian_model_zip)
-            print("✅ Persian model downloaded successfully!")
-        except Exception as e:
-            print(f"❌ Failed to download Persian model: {e}")
-    else:
-        print("✅ Persian model already exists!")
-    
-    # Download English model (fallback)
-    if not os.path.exists(english_model_dir):
-        try:
-            download_file(english_model_url, english_model_zip)
-            extract_zip(english_model_zip, ".")
-            os.remove(english_model_zip)
-            print("✅ English model downloaded successfully!")
-        except Exception as e:
-            print(f"❌ Failed to download English model: {e}")
-    else:
-        print("✅ English model already exists!")
+    """Download Vosk models, all at once"""
+    with ThreadPoolExecutor(max_workers=len(MODELS)) as executor:
+        for future in [executor.submit(_download_model, *model) for model in MODELS]:
+            future.result()
 
 if __name__ == "__main__":
     print("🚀 Downloading Vosk models for offline speech recognition...")
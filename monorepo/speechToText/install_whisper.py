@@ -32,13 +32,6 @@ def main():
     if not run_command(f"{sys.executable} -m pip install --upgrade setuptools wheel", "Installing build tools"):
         print("⚠️  Build tools installation failed, continuing anyway...")
     
-    # Install PyTorch first (CPU version for compatibility)
-    if not run_command(f"{sys.executable} -m pip install torch torchaudio --index-url https://download.pytorch.org/whl/cpu", "Installing PyTorch (CPU version)"):
-        print("⚠️  PyTorch installation failed, trying alternative...")
-        if not run_command(f"{sys.executable} -m pip install torch torchaudio", "Installing PyTorch (alternative)"):
-            print("❌ PyTorch installation failed completely")
-            return False
-    
     # Install other dependencies
     dependencies = [
         "fastapi==0.104.1",
@@ -53,12 +46,11 @@ def main():
         if not run_command(f"{sys.executable} -m pip install {dep}", f"Installing {dep}"):
             print(f"⚠️  Failed to install {dep}, continuing...")
     
-    # Install Whisper last
+    # Install Whisper last (faster-whisper brings its own CTranslate2 runtime; no PyTorch needed)
     print("\n🎤 Installing Whisper...")
     whisper_commands = [
-        f"{sys.executable} -m pip install openai-whisper",
-        f"{sys.executable} -m pip install git+https://github.com/openai/whisper.git",
-        f"{sys.executable} -m pip install --no-deps openai-whisper"
+        f"{sys.executable} -m pip install \"faster-whisper>=1.1.0\"",
+        f"{sys.executable} -m pip install --upgrade \"faster-whisper>=1.1.0\""
     ]
     
     whisper_installed = False
@@ -72,19 +64,18 @@ def main():
         print("\n🔧 Manual installation steps:")
         print("1. Install FFmpeg: https://ffmpeg.org/download.html")
         print("2. Add FFmpeg to your PATH")
-        print("3. Try: pip install openai-whisper")
+        print("3. Try: pip install faster-whisper")
         return False
     
     # Test installation
     print("\n🧪 Testing installation...")
     try:
-        import whisper
-        import torch
-        print("✅ Whisper and PyTorch imported successfully")
+        from faster_whisper import WhisperModel
+        print("✅ faster-whisper imported successfully")
         
         # Test model loading
         print("🔍 Testing model loading...")
-        model = whisper.load_model("tiny")  # Use tiny model for testing
+        model = WhisperModel("tiny", device="cpu", compute_type="int8")  # Use tiny model for testing
         print("✅ Model loading test successful")
         
     except Exception as e:
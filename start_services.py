@@ -4,18 +4,101 @@ Startup script for LangExtract services
 Runs both the main backend and speech-to-text microservice
 """
 
+import selectors
+import shutil
+import signal
 import subprocess
 import sys
+import threading
 import time
 import os
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-def run_command(cmd, cwd=None, background=False):
-    """Run a command in the background or foreground"""
+def run_command(cmd, cwd=None, background=False, capture=False):
+    """Run an argv list in the background or foreground, without an intermediate shell"""
+    # Resolve e.g. npm -> npm.cmd on Windows, which shell=False won't do by itself
+    cmd = [shutil.which(cmd[0]) or cmd[0], *cmd[1:]]
     if background:
-        return subprocess.Popen(cmd, cwd=cwd, shell=True)
+        # stdout and stderr share one pipe that pump_logs drains
+        output = {"stdout": subprocess.PIPE, "stderr": subprocess.STDOUT, "bufsize": 0} if capture else {}
+        # Own process group, so stopping a service also reaches its children (uvicorn reloader, vite)
+        if os.name == "nt":
+            return subprocess.Popen(cmd, cwd=cwd, creationflags=subprocess.CREATE_NEW_PROCESS_GROUP, **output)
+        return subprocess.Popen(cmd, cwd=cwd, start_new_session=True, **output)
     else:
-        return subprocess.run(cmd, cwd=cwd, shell=True)
+        return subprocess.run(cmd, cwd=cwd)
+
+def stop_process(process, force=False):
+    """Signal a service started by run_command, along with its process group"""
+    if os.name == "nt":
+        if force:
+            process.kill()
+        else:
+            process.send_signal(signal.CTRL_BREAK_EVENT)
+    else:
+        try:
+            os.killpg(process.pid, signal.SIGKILL if force else signal.SIGTERM)
+        except ProcessLookupError:
+            pass  # the whole group has already exited
+
+def watch_output(selector, name, process):
+    """Register a service's output pipe so pump_logs forwards it"""
+    if selector is not None:
+        selector.register(process.stdout, selectors.EVENT_READ, data=(name.encode(), bytearray()))
+
+def pump_logs(selector, timeout):
+    """Forward complete lines the services have written, prefixed with the service name"""
+    if selector is None or not selector.get_map():
+        time.sleep(timeout)
+        return
+    for key, _ in selector.select(timeout):
+        name, pending = key.data
+        chunk = os.read(key.fd, 65536)
+        if chunk:
+            pending += chunk
+            end = pending.rfind(b"\n") + 1
+            if not end:
+                continue
+            lines = bytes(pending[:end])
+            del pending[:end]
+        else:
+            # Service exited; flush its last partial line
+            selector.unregister(key.fileobj)
+            lines = pending + b"\n" if pending else b""
+        sys.stdout.flush()
+        for line in lines.splitlines(keepends=True):
+            sys.stdout.buffer.write(b"[" + name + b"] " + line)
+        sys.stdout.buffer.flush()
+
+def wait_for(url, process, timeout=30.0, interval=0.1, stop=None):
+    """Poll url until it answers 200; gives up on timeout, if the process exits or once stop is set"""
+    stop = stop or threading.Event()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and not stop.is_set():
+        if process.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(url, timeout=0.5) as response:
+                if response.status == 200:
+                    return True
+        except OSError:
+            pass
+        stop.wait(interval)
+    return False
+
+def wait_stopped(process, selector, timeout):
+    """Wait up to timeout for a service to exit, forwarding its logs meanwhile"""
+    deadline = time.monotonic() + timeout
+    while process.poll() is None:
+        if time.monotonic() >= deadline:
+            raise subprocess.TimeoutExpired(process.args, timeout)
+        pump_logs(selector, 0.1)
+
+def raise_interrupt(signum, frame):
+    """Treat SIGTERM/SIGHUP like Ctrl+C so the services are stopped, not orphaned"""
+    raise KeyboardInterrupt
 
 def main():
     print("🚀 Starting LangExtract Services...")
@@ -27,62 +110,106 @@ def main():
     frontend_dir = project_root / "monorepo" / "frontend"
     
     processes = []
+    # Pipes can't be polled with select() on Windows; services there write to the console directly
+    log_selector = selectors.DefaultSelector() if os.name != "nt" else None
+    # Services run in their own sessions, so a terminal hangup or kill doesn't reach them
+    stop_signals = [signal.SIGINT, signal.SIGTERM] + ([signal.SIGHUP] if hasattr(signal, "SIGHUP") else [])
+    for sig in stop_signals[1:]:
+        signal.signal(sig, raise_interrupt)
+    # Tells the readiness checks to give up when we are interrupted
+    stop_waiting = threading.Event()
+    executor = None
     
     try:
         # Start speech-to-text service
         print("🎤 Starting Speech-to-Text service on port 8001...")
         speech_process = run_command(
-            "python app.py",
+            [sys.executable, "app.py"],
             cwd=speech_dir,
-            background=True
+            background=True,
+            capture=log_selector is not None
         )
+        watch_output(log_selector, "Speech-to-Text", speech_process)
         processes.append(("Speech-to-Text", speech_process))
         
-        # Wait a bit for speech service to start
-        time.sleep(3)
-        
         # Start main backend service
         print("🔧 Starting Main Backend service on port 8000...")
         backend_process = run_command(
-            "python -m uvicorn app.main:app --host 0.0.0.0 --port 8000 --reload",
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "0.0.0.0", "--port", "8000", "--reload"],
             cwd=backend_dir,
-            background=True
+            background=True,
+            capture=log_selector is not None
         )
+        watch_output(log_selector, "Main Backend", backend_process)
         processes.append(("Main Backend", backend_process))
         
-        # Wait a bit for backend to start
-        time.sleep(3)
-        
         # Start frontend development server
         print("🌐 Starting Frontend development server on port 5173...")
         frontend_process = run_command(
-            "npm run dev",
+            ["npm", "run", "dev"],
             cwd=frontend_dir,
-            background=True
+            background=True,
+            capture=log_selector is not None
         )
+        watch_output(log_selector, "Frontend", frontend_process)
         processes.append(("Frontend", frontend_process))
         
+        # Wait for all services together; the speech service loads its Whisper model before answering
+        readiness = [
+            ("Speech-to-Text", "http://localhost:8001/health", speech_process, 600),
+            ("Main Backend", "http://localhost:8000/api/health", backend_process, 60),
+            ("Frontend", "http://localhost:5173/", frontend_process, 60),
+        ]
+        executor = ThreadPoolExecutor(max_workers=len(readiness))
+        futures = {
+            executor.submit(wait_for, url, process, timeout, stop=stop_waiting): name
+            for name, url, process, timeout in readiness
+        }
+        pending = set(futures)
+        while pending:
+            # Keep draining service output while waiting so no pipe fills up and blocks a service
+            pump_logs(log_selector, 0.1)
+            for future in [f for f in pending if f.done()]:
+                pending.discard(future)
+                if future.result():
+                    print(f"✅ {futures[future]} is ready")
+                else:
+                    print(f"⚠️  {futures[future]} did not become ready")
+        executor.shutdown()
+        
         print("\n✅ All services started!")
         print("📱 Frontend: http://localhost:5173")
         print("🔧 Backend API: http://localhost:8000")
         print("🎤 Speech-to-Text: http://localhost:8001")
         print("\nPress Ctrl+C to stop all services...")
         
-        # Keep the script running
+        # Keep the script running, forwarding service logs
         while True:
-            time.sleep(1)
+            pump_logs(log_selector, 1.0)
             
     except KeyboardInterrupt:
+        pass
+    except FileNotFoundError as e:
+        # Popen without a shell raises instead of printing "not found"
+        print(f"❌ {e.filename} not found; is it installed and on PATH?")
+    finally:
+        # Runs on errors too, so services already started in their own sessions are not left running;
+        # a second signal must not cut the shutdown short
+        for sig in stop_signals:
+            signal.signal(sig, signal.SIG_IGN)
         print("\n🛑 Stopping all services...")
+        stop_waiting.set()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
         
         # Stop all processes
         for name, process in processes:
             try:
-                process.terminate()
-                process.wait(timeout=5)
+                stop_process(process)
+                wait_stopped(process, log_selector, timeout=5)
                 print(f"✅ {name} stopped")
             except subprocess.TimeoutExpired:
-                process.kill()
+                stop_process(process, force=True)
                 print(f"⚠️  {name} force stopped")
             except Exception as e:
                 print(f"❌ Error stopping {name}: {e}")